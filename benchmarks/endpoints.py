@@ -0,0 +1,216 @@
+"""
+Measure the latency, query count, peak memory and response size of the
+task and project endpoints on generated datasets, and write them as JSON.
+
+    python -m benchmarks.endpoints --scale 1k 100k --fanout 0 5 --output results.json
+    python -m benchmarks.endpoints --compare results.json
+
+Runs in process against SQLite through the test settings. Pass --settings with
+a module whose DATABASES points at postgres to benchmark on postgres instead.
+Compare the JSON of two commits with --compare to list the endpoints that got slower.
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import tracemalloc
+from datetime import datetime, timezone
+from itertools import count, cycle
+
+from django.urls import reverse
+
+from benchmarks.utils import benchmark_database, populate, setup_django
+
+SCALES = {'1k': 1000, '100k': 100000, '1M': 1000000}
+
+
+class Endpoints:
+    """The requests that are measured, repeating them leaves the measured rows as they were"""
+    names = (
+        'task_list', 'task_list_page', 'task_search', 'task_retrieve', 'task_create', 'task_status',
+        'project_list', 'project_retrieve', 'project_create', 'project_update', 'project_delete'
+    )
+
+    def __init__(self, user_pks: list):
+        from django.contrib.auth.models import User
+        from rest_framework.test import APIClient
+
+        from umsebenzi.enums import Issue, TaskStatus
+        from umsebenzi.models import Project, Task
+
+        self.user = User.objects.get(pk=user_pks[0])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.project = Project.objects.filter(created_by=self.user).earliest('id')
+        # The retrieved task is one of the users own epics, whatever the dataset
+        self.task = Task.objects.filter(issue=Issue.EPIC).exclude(status=TaskStatus.ARCHIVE).earliest('id')
+        Task.objects.filter(pk=self.task.pk).update(created_by=self.user)
+        self.statuses = cycle(['REVIEW', 'IN_PROGRESS'])
+        self.codes = cycle(['BM', self.project.code])
+        self.created = count()
+
+    def task_list(self):
+        return self.client.get(reverse('task-list'), format='json')
+
+    def task_list_page(self):
+        return self.client.get(reverse('task-list'), {'page_size': 100}, format='json')
+
+    def task_search(self):
+        return self.client.get(reverse('task-list'), {'q': 'login', 'page_size': 100}, format='json')
+
+    def task_retrieve(self):
+        return self.client.get(reverse('task-detail', kwargs={'code': self.task.code}), format='json')
+
+    def task_create(self):
+        return self.client.post(reverse('task-list'), {
+            'title': 'Benchmark',
+            'description': 'Benchmark task',
+            'project_id': self.project.pk,
+            'assigned_to_id': self.user.pk
+        }, format='json')
+
+    def task_status(self):
+        url = reverse('task-status', kwargs={'code': self.task.code})
+        return self.client.patch(url, {'status': next(self.statuses)}, format='json')
+
+    def project_list(self):
+        return self.client.get(reverse('project-list'), format='json')
+
+    def project_retrieve(self):
+        return self.client.get(reverse('project-detail', kwargs={'pk': self.project.pk}), format='json')
+
+    def project_create(self):
+        return self.client.post(reverse('project-list'), {
+            'title': 'Benchmark',
+            'description': 'Benchmark project',
+            'code': f'C{next(self.created)}'
+        }, format='json')
+
+    def project_update(self):
+        # Renames every task code of the project, and back again on the next call
+        return self.client.put(reverse('project-detail', kwargs={'pk': self.project.pk}), {
+            'title': self.project.title,
+            'description': self.project.description,
+            'code': next(self.codes)
+        }, format='json')
+
+    def project_delete(self):
+        pk = self.project_create().json()['id']
+        return self.client.delete(reverse('project-detail', kwargs={'pk': pk}))
+
+
+def measure(request, repeat: int) -> dict:
+    """Time the request repeat times, then run it once more for its queries and peak memory"""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from benchmarks.utils import timer
+
+    timings = {}
+    for i in range(repeat):
+        with timer(timings, i):
+            response = request()
+        assert response.status_code < 300, response.content
+
+    # tracemalloc slows python down, so memory is measured on its own run
+    tracemalloc.start()
+    with CaptureQueriesContext(connection) as ctx:
+        response = request()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    seconds = sorted(timings.values())
+    return {
+        'median_ms': statistics.median(seconds) * 1000,
+        'p95_ms': seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))] * 1000,
+        'queries': len(ctx.captured_queries),
+        'peak_memory_kib': peak / 1024,
+        'response_bytes': len(response.content),
+    }
+
+
+def run(tasks: int, fanout: int, users: int, repeat: int) -> list:
+    random.seed(0)
+    user_pks = populate(tasks, users, fanout)
+    endpoints = Endpoints(user_pks)
+    results = []
+    for name in Endpoints.names:
+        result = measure(getattr(endpoints, name), repeat)
+        results.append({'tasks': tasks, 'fanout': fanout, 'endpoint': name, **result})
+        print(f"{tasks:>8} tasks fanout {fanout:<3} {name:<17} {result['median_ms']:9.2f}ms "
+              f"{result['queries']:3} queries {result['peak_memory_kib']:10.0f}KiB")
+    return results
+
+
+def metadata() -> dict:
+    import django
+    from django.db import connection
+
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'date': datetime.now(timezone.utc).isoformat(),
+        'database': connection.vendor,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+    }
+
+
+def compare(old: dict, new: dict, threshold: float):
+    """Print the endpoints whose median latency or query count grew"""
+    def key(result):
+        return result['tasks'], result['fanout'], result['endpoint']
+
+    before = {key(result): result for result in old['results']}
+    for result in new['results']:
+        previous = before.get(key(result))
+        if previous is None:
+            continue
+        ratio = result['median_ms'] / previous['median_ms']
+        if ratio > threshold or result['queries'] > previous['queries']:
+            print(f'{key(result)}: {previous["median_ms"]:.2f}ms -> {result["median_ms"]:.2f}ms '
+                  f'({ratio:.2f}x), {previous["queries"]} -> {result["queries"]} queries')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', nargs='+', choices=SCALES, default=['1k'])
+    parser.add_argument('--fanout', nargs='+', type=int, default=[0, 5], help='subtasks per epic')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--settings', help='django settings module, defaults to the test settings')
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--compare', help='earlier results to compare with')
+    parser.add_argument('--threshold', type=float, default=1.2, help='slowdown reported by --compare')
+    args = parser.parse_args()
+
+    setup_django(args.settings)
+    from django.test.utils import setup_test_environment
+    # Lets the test client's host through ALLOWED_HOSTS
+    setup_test_environment()
+
+    results = []
+    for scale in args.scale:
+        for fanout in args.fanout:
+            with benchmark_database():
+                results.extend(run(SCALES[scale], fanout, args.users, args.repeat))
+
+    report = {'meta': metadata(), 'results': results}
+    with open(args.output, 'w') as output:
+        json.dump(report, output, indent=2)
+    print(f'Results written to {args.output}')
+
+    if args.compare:
+        with open(args.compare) as previous:
+            compare(json.load(previous), report, args.threshold)
+
+
+if __name__ == '__main__':
+    main()
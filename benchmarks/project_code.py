@@ -0,0 +1,67 @@
+"""
+Compare rewriting task codes after a project code change one task at a time
+with the single UPDATE ProjectSerializer.update runs.
+
+    python -m benchmarks.project_code --tasks 50000
+"""
+import argparse
+
+from benchmarks.utils import benchmark_database, setup_django, timer
+
+
+def loop_rewrite(project, code):
+    """The per task loop ProjectSerializer.update used to run"""
+    for task in project.tasks.all():
+        task.code = task.code.replace(project.code, code)
+        task.save()
+    project.code = code
+    project.save()
+
+
+def serializer_rewrite(project, code):
+    from umsebenzi.serializers import ProjectSerializer
+
+    serializer = ProjectSerializer(project, data={
+        'title': project.title,
+        'description': project.description,
+        'code': code
+    })
+    serializer.is_valid(raise_exception=True)
+    serializer.save()
+
+
+def run(tasks: int) -> dict:
+    from tests.factory import ProjectFactory, TaskFactory, UserFactory
+    from umsebenzi.models import Task
+
+    user = UserFactory()
+    project = ProjectFactory(created_by=user)
+    Task.objects.bulk_create(
+        TaskFactory.build(project=project, created_by=user, assigned_to=user, code=f'NP-{i}')
+        for i in range(1, tasks + 1)
+    )
+
+    results = {'tasks': tasks}
+    with timer(results, 'loop_seconds'):
+        loop_rewrite(project, 'EX')
+    with timer(results, 'update_seconds'):
+        serializer_rewrite(project, 'NP')
+    assert Task.objects.filter(code__startswith='NP-').count() == tasks
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tasks', type=int, default=10000)
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        results = run(args.tasks)
+    print(f"{results['tasks']} tasks: loop {results['loop_seconds']:.3f}s, "
+          f"single update {results['update_seconds']:.3f}s "
+          f"({results['loop_seconds'] / results['update_seconds']:.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import os
+import random
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+# Task titles are made of these, so searches match a fraction of the tasks
+WORDS = (
+    'login', 'release', 'sprint', 'invoice', 'report', 'dashboard', 'export', 'import', 'upload', 'search',
+    'payment', 'profile', 'email', 'backup', 'cache', 'deploy', 'refactor', 'migrate', 'review', 'audit',
+    'onboarding', 'billing', 'checkout', 'notification', 'settings', 'permissions', 'analytics', 'mobile',
+    'session', 'password', 'database', 'schema', 'api', 'webhook', 'queue', 'worker', 'timeout', 'latency',
+    'crash', 'layout', 'translation', 'calendar', 'reminder', 'archive', 'comment', 'attachment', 'filter',
+    'sorting', 'pagination', 'feedback',
+)
+
+
+def setup_django(settings: Optional[str] = None):
+    """
+    Configure django with the test settings the benchmarks run against,
+    or with the settings module given, eg one with a postgres DATABASES
+    """
+    if settings:
+        os.environ['DJANGO_SETTINGS_MODULE'] = settings
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.test_settings')
+    import django
+    django.setup()
+
+
+@contextmanager
+def benchmark_database():
+    """Create a throw away test database for the duration of a benchmark"""
+    from django.db import connection
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+@contextmanager
+def timer(results: dict, name: str):
+    """Store the wall clock seconds the block took in results[name]"""
+    start = time.perf_counter()
+    yield
+    results[name] = time.perf_counter() - start
+
+
+def populate(tasks: int, users: int, fanout: int = 0, batch_size: int = 10000) -> list:
+    """
+    Generate tasks with random statuses, creators and assignees from the test factories.
+    Every epic is followed by `fanout` of its subtasks and each batch_size tasks get
+    a project of their own. Returns the user pks, the first one owns every project.
+    """
+    from django.contrib.auth.models import User
+
+    from tests.factory import ProjectFactory, TaskFactory, UserFactory
+    from umsebenzi.counters import rebuild_counters
+    from umsebenzi.enums import Issue, TaskStatus
+    from umsebenzi.models import Project, Task
+
+    User.objects.bulk_create(UserFactory.build() for _ in range(users))
+    user_pks = list(User.objects.values_list('pk', flat=True))
+    statuses = list(TaskStatus)
+
+    def build(project, number, **kwargs):
+        return TaskFactory.build(
+            project=project,
+            created_by_id=random.choice(user_pks),
+            assigned_to_id=random.choice(user_pks),
+            status=random.choice(statuses),
+            code=f'{project.code}-{number}',
+            title=' '.join(random.sample(WORDS, 3)),
+            **kwargs
+        )
+
+    for start in range(0, tasks, batch_size):
+        project = ProjectFactory(code=f'P{start // batch_size}', created_by_id=user_pks[0])
+        numbers = range(1, min(batch_size, tasks - start) + 1)
+        epics = Task.objects.bulk_create(
+            build(project, number, issue=Issue.EPIC)
+            for number in numbers if (number - 1) % (fanout + 1) == 0
+        )
+        Task.objects.bulk_create(
+            build(project, number, issue=Issue.SUBTASK, parent=epics[(number - 1) // (fanout + 1)])
+            for number in numbers if (number - 1) % (fanout + 1)
+        )
+        Project.objects.filter(pk=project.pk).update(next_task_number=numbers[-1] + 1)
+    rebuild_counters()
+    return user_pks
@@ -0,0 +1,70 @@
+"""
+Compare the 'or' and 'union' visibility strategies of TaskViewSet on a
+generated task table, timing the task list query of one user.
+
+    python -m benchmarks.visibility --tasks 1000000 --users 1000
+"""
+import argparse
+import random
+
+from benchmarks.utils import benchmark_database, populate, setup_django, timer
+
+STRATEGIES = ('or', 'union')
+
+
+def list_queryset(user_pk: int):
+    from django.contrib.auth.models import User
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from umsebenzi.views import TaskViewSet
+
+    request = Request(APIRequestFactory().get('/tasks'))
+    request.user = User(pk=user_pk)
+    return TaskViewSet(action='list', request=request, format_kwarg=None).get_queryset()
+
+
+def run(tasks: int, users: int, repeat: int) -> dict:
+    from django.db import connection
+    from django.test import override_settings
+
+    random.seed(0)
+    # Epics only, every task shows up in the list
+    user_pks = populate(tasks, users)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+    results = {'tasks': tasks, 'users': users}
+    rows = {}
+    for strategy in STRATEGIES:
+        with override_settings(UMSEBENZI_VISIBILITY_STRATEGY=strategy):
+            results[f'{strategy}_plan'] = list_queryset(user_pks[1]).explain()
+            timings = {}
+            for i in range(repeat):
+                user_pk = user_pks[i % len(user_pks)]
+                with timer(timings, i):
+                    rows[strategy, user_pk] = sorted(task.pk for task in list_queryset(user_pk))
+            results[f'{strategy}_seconds'] = min(timings.values())
+    # Both strategies have to list the same tasks
+    assert all(rows['or', user_pk] == rows['union', user_pk] for _, user_pk in rows)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tasks', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        results = run(args.tasks, args.users, args.repeat)
+    for strategy in STRATEGIES:
+        print(f'{strategy}:\n{results[f"{strategy}_plan"]}')
+    print(f"{results['tasks']} tasks, {results['users']} users: "
+          f"or {results['or_seconds'] * 1000:.1f}ms, union {results['union_seconds'] * 1000:.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
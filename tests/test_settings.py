@@ -1,3 +1,6 @@
+import os
+import tempfile
+
 SECRET_KEY = 'fake-key'
 INSTALLED_APPS = [
     'django.contrib.auth',
@@ -12,6 +15,9 @@ ROOT_URLCONF = 'tests.urls'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
+        # A file database lets threaded tests share it through sqlite's own locking,
+        # kept out of the working tree in case a run is interrupted
+        'TEST': {'NAME': os.path.join(tempfile.gettempdir(), 'test_umsebenzi.sqlite3')},
     }
 }
 
@@ -1,12 +1,41 @@
+import csv
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+from operator import itemgetter
+from unittest.mock import patch
+
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase
+from django.test import TransactionTestCase, override_settings
 from django.urls import reverse
-from .factory import TaskFactory, ProjectFactory
+from django.utils.http import http_date
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from .factory import TaskFactory, ProjectFactory, UserFactory
 
 from django.contrib.auth.models import User
+from django.db import connection, close_old_connections, transaction
+from django.core.cache import cache
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
 
-from umsebenzi.models import Project, Task
+from umsebenzi.models import Project, Task, ProjectTaskCounter, TaskStatusTransition
+from umsebenzi.transitions import WORKFLOW, get_transitions
+from umsebenzi.analytics import week_start
+from umsebenzi.exceptions import AppendOnlyException
+from umsebenzi.search import install_fts
+from umsebenzi.signals import load_search_table
 from umsebenzi.enums import TaskStatus, Issue
 from umsebenzi.forms import TaskForm
+from umsebenzi.latest import get_task_code
+from umsebenzi.counters import rebuild_counters
+from umsebenzi.cache import list_cache
+from umsebenzi.serializers import BulkStatusSerializer, TaskStatusSerializer
+from umsebenzi.renderers import NDJSONRenderer
+from umsebenzi.views import TaskViewSet
 
 
 class ProjectTestCase(APITestCase):
@@ -95,6 +124,7 @@ class ProjectTestCase(APITestCase):
             },
             'created_at': self.project.created_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
             'modified_at': self.project.modified_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+            'task_counts': {s.name: 0 for s in TaskStatus},
         }])
 
     def test_project_code_update(self):
@@ -126,6 +156,35 @@ class ProjectTestCase(APITestCase):
         self.assertEqual(self.project.title, 'New Title')
         self.assertEqual(task.code, 'EX-1')
 
+    def test_project_code_update_prefix_only(self):
+        """
+        Only the code prefix is swapped, the old code elsewhere in a task code is kept
+        """
+        task = TaskFactory(project=self.project, created_by=self.creator, assigned_to=self.assignee, code='NP-NP-1')
+        modified_at = task.modified_at
+
+        url = reverse('project-detail', kwargs={'pk': self.project.id})
+        data = {
+            'title': self.project.title,
+            'description': self.project.description,
+            'code': 'EX'
+        }
+        self.client.force_login(self.creator)
+        with self.assertNumQueries(10):
+            resp = self.client.put(url, data, format='json')
+        self.assertEqual(resp.status_code, 200)
+
+        task.refresh_from_db()
+        self.assertEqual(task.code, 'EX-NP-1')
+        self.assertGreater(task.modified_at, modified_at)
+
+    def test_update_keeps_task_counter(self):
+        project = Project.objects.get(pk=self.project.pk)
+        self.assertEqual(get_task_code(self.project), 1)
+        project.title = 'Stale'
+        project.save()
+        self.assertEqual(get_task_code(self.project), 2)
+
 
 class TaskTestCase(APITestCase):
     url = reverse('task-list')
@@ -217,6 +276,8 @@ class TaskTestCase(APITestCase):
                 'email': ''
             },
             'subtasks': [],
+            'subtask_count': 0,
+            'subtask_done_count': 0,
             'parent': None
         })
 
@@ -431,6 +492,8 @@ class SubTasksTestCase(APITestCase):
                 'url': f'{self.test_server}{reverse("project-detail", kwargs={"pk": self.project.id})}'
             },
             'subtasks': [],
+            'subtask_count': 0,
+            'subtask_done_count': 0,
             'parent': self.task.id
         })
 
@@ -440,6 +503,7 @@ class SubTasksTestCase(APITestCase):
             created_by=self.creator, assigned_to=self.assignee,
             parent=self.task, code='NP-100'
         )
+        rebuild_counters()
         resp = self.client.get(self.url, format='json')
         self.assertEqual(resp.json(), [
             {
@@ -468,11 +532,41 @@ class SubTasksTestCase(APITestCase):
                         'title': 'First Task',
                         'url': f"{self.test_server}{reverse('task-detail', kwargs={'code': subtask.code})}"
                     }],
+                'subtask_count': 1,
+                'subtask_done_count': 0,
                 'title': 'First Task',
                 'parent': None
             }
         ])
 
+    def test_subtask_list_query_count(self):
+        """
+        Subtasks are batched so the list runs the same queries for any number of epics
+        """
+        TaskFactory(
+            project=self.project, issue=Issue.SUBTASK,
+            created_by=self.creator, assigned_to=self.assignee,
+            parent=self.task, code='NP-100'
+        )
+        with self.assertNumQueries(5):
+            resp = self.client.get(self.url, format='json')
+        self.assertEqual(len(resp.json()), 1)
+
+        for i in range(2, 6):
+            epic = TaskFactory(
+                project=self.project, created_by=self.creator,
+                assigned_to=UserFactory(), code=f'NP-{i}'
+            )
+            TaskFactory(
+                project=self.project, issue=Issue.SUBTASK,
+                created_by=self.creator, assigned_to=self.assignee,
+                parent=epic, code=f'NP-{i}00'
+            )
+        with self.assertNumQueries(5):
+            resp = self.client.get(self.url, format='json')
+        self.assertEqual(len(resp.json()), 5)
+        self.assertTrue(all(len(t['subtasks']) == 1 for t in resp.json()))
+
     def test_subtask_to_epic(self):
         """
         Remove parent if subtask becomes epic
@@ -563,3 +657,1576 @@ class AdminFormTestCase(APITestCase):
         })
         self.assertFalse(form.is_valid())
         self.assertEqual(form.errors['__all__'], ["Subtask parent(epic) must belong to same project"])
+
+
+class QueryPlanTestCase(APITestCase):
+    """
+    Each endpoint runs a fixed number of queries however many rows it renders.
+    Two of them are the session and user lookups for the logged in user and
+    list and retrieve run one more for their ETag.
+    """
+
+    def setUp(self) -> None:
+        self.creator = User.objects.create(username='creator', password='password')
+        self.client.force_login(self.creator)
+        for i in range(3):
+            project = ProjectFactory(code=f'P{i}', created_by=self.creator)
+            epic = TaskFactory(
+                project=project, created_by=self.creator,
+                assigned_to=UserFactory(), code=f'P{i}-1'
+            )
+            TaskFactory(
+                project=project, issue=Issue.SUBTASK, parent=epic,
+                created_by=self.creator, assigned_to=UserFactory(), code=f'P{i}-2'
+            )
+        self.task = epic
+
+    def test_task_list(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse('task-list'), format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.json()), 3)
+        self.assertEqual(len(ctx.captured_queries), 5)
+        self.assertNotIn('password', ctx.captured_queries[3]['sql'])
+
+    def test_task_retrieve(self):
+        url = reverse('task-detail', kwargs={'code': self.task.code})
+        with self.assertNumQueries(5):
+            resp = self.client.get(url, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.json()['subtasks']), 1)
+
+    def test_task_status(self):
+        # The locking read, task save, counter changes and transition history run in a savepoint
+        url = reverse('task-status', kwargs={'code': self.task.code})
+        with self.assertNumQueries(10):
+            resp = self.client.patch(url, {'status': 'IN_PROGRESS'}, format='json')
+        self.assertEqual(resp.status_code, 200)
+
+    def test_project_list(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse('project-list'), format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.json()), 3)
+        self.assertEqual(len(ctx.captured_queries), 5)
+        self.assertNotIn('password', ctx.captured_queries[3]['sql'])
+
+    def test_project_retrieve(self):
+        url = reverse('project-detail', kwargs={'pk': self.task.project_id})
+        with self.assertNumQueries(5):
+            resp = self.client.get(url, format='json')
+        self.assertEqual(resp.status_code, 200)
+
+
+class PaginationTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.creator = User.objects.create(username='creator', password='password')
+        self.client.force_login(self.creator)
+        self.project = ProjectFactory(created_by=self.creator)
+        self.tasks = [
+            TaskFactory(project=self.project, created_by=self.creator, assigned_to=self.creator, code=f'NP-{i}')
+            for i in range(5)
+        ]
+
+    def test_unpaginated_by_default(self):
+        resp = self.client.get(reverse('task-list'), format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.json()), 5)
+
+    def test_task_pages(self):
+        codes = []
+        url = f"{reverse('task-list')}?page_size=2"
+        while url:
+            resp = self.client.get(url, format='json')
+            self.assertEqual(resp.status_code, 200)
+            self.assertLessEqual(len(resp.json()['results']), 2)
+            codes += [t['code'] for t in resp.json()['results']]
+            url = resp.json()['next']
+        self.assertEqual(codes, [t.code for t in reversed(self.tasks)])
+
+    def test_project_pages(self):
+        ProjectFactory(code='EX', created_by=self.creator)
+        resp = self.client.get(f"{reverse('project-list')}?page_size=1", format='json')
+        self.assertEqual(resp.json()['results'][0]['code'], 'EX')
+
+        resp = self.client.get(resp.json()['next'], format='json')
+        self.assertEqual(resp.json()['results'][0]['code'], 'NP')
+        self.assertIsNone(resp.json()['next'])
+
+    def test_invalid_cursor(self):
+        resp = self.client.get(f"{reverse('task-list')}?cursor=invalid", format='json')
+        self.assertEqual(resp.status_code, 404)
+
+
+class TaskCodeTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.creator = User.objects.create(username='creator', password='password')
+        self.client.force_login(self.creator)
+        self.project = ProjectFactory(created_by=self.creator)
+
+    def test_sequential_codes(self):
+        data = {
+            'assigned_to_id': self.creator.id,
+            'description': 'Write Tests to finish project',
+            'project_id': self.project.id,
+            'title': 'Write Tests'
+        }
+        codes = [self.client.post(reverse('task-list'), data, format='json').json()['code'] for _ in range(3)]
+        self.assertEqual(codes, ['NP-1', 'NP-2', 'NP-3'])
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.next_task_number, 4)
+
+    def test_counter_seeded_from_latest_task(self):
+        TaskFactory(project=self.project, created_by=self.creator, assigned_to=self.creator, code='NP-7')
+        self.assertEqual(get_task_code(self.project), 8)
+        self.assertEqual(get_task_code(self.project), 9)
+
+
+class ConcurrentTaskCodeTestCase(TransactionTestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create(username='creator', password='password')
+        self.project = ProjectFactory(created_by=self.user)
+
+    def create_task(self, i):
+        try:
+            form = TaskForm(data={
+                'project': self.project.id,
+                'title': f'Task {i}',
+                'description': 'Burst',
+                'status': TaskStatus.DRAFT.value,
+                'created_by': self.user.id,
+                'assigned_to': self.user.id,
+                'issue': Issue.EPIC.value,
+            })
+            self.assertTrue(form.is_valid(), form.errors)
+            return form.save().code
+        finally:
+            close_old_connections()
+
+    def test_no_duplicate_codes(self):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            codes = list(executor.map(self.create_task, range(40)))
+        self.assertEqual(len(set(codes)), 40)
+        self.assertEqual(sorted(codes), sorted(f'NP-{i}' for i in range(1, 41)))
+
+
+class BulkCreateTestCase(APITestCase):
+    url = reverse('task-bulk')
+
+    def setUp(self) -> None:
+        self.creator = User.objects.create(username='creator', password='password')
+        self.assignee = User.objects.create(username='assignee', password='password')
+        self.client.force_login(self.creator)
+        self.project = ProjectFactory(created_by=self.creator)
+        self.other_project = ProjectFactory(code='EX', created_by=self.creator)
+
+    def tasks(self, count):
+        return [{
+            'assigned_to_id': self.assignee.id,
+            'description': 'Imported',
+            'project_id': project.id,
+            'title': f'Task {i}'
+        } for i in range(count) for project in (self.project, self.other_project)]
+
+    def test_bulk_create(self):
+        resp = self.client.post(self.url, self.tasks(2), format='json')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual([t['code'] for t in resp.json()], ['NP-1', 'EX-1', 'NP-2', 'EX-2'])
+        self.assertEqual(Task.objects.filter(created_by=self.creator).count(), 4)
+
+        resp = self.client.post(reverse('task-list'), self.tasks(1)[0], format='json')
+        self.assertEqual(resp.json()['code'], 'NP-3')
+
+    def test_bulk_create_lock_order(self):
+        # Projects are locked in id order whatever order the request names them in
+        with patch('umsebenzi.serializers.get_task_code', wraps=get_task_code) as reserve:
+            self.client.post(self.url, list(reversed(self.tasks(1))), format='json')
+        self.assertEqual([c.args[0].pk for c in reserve.call_args_list], [self.project.pk, self.other_project.pk])
+
+    def test_bulk_create_query_count(self):
+        # Seed the projects code counters first
+        self.client.post(self.url, self.tasks(1), format='json')
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(self.url, self.tasks(2), format='json')
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(self.url, self.tasks(20), format='json')
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+        self.assertEqual(Task.objects.count(), 46)
+
+    def test_bulk_create_invalid(self):
+        tasks = self.tasks(1)
+        tasks[1]['assigned_to_id'] = 1000
+        resp = self.client.post(self.url, tasks, format='json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json(), [{}, {'assigned_to_id': ['Invalid pk "1000" - object does not exist.']}])
+        self.assertEqual(Task.objects.count(), 0)
+
+    def test_bulk_create_empty(self):
+        resp = self.client.post(self.url, [], format='json')
+        self.assertEqual(resp.status_code, 400)
+
+
+class CountersTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.creator = User.objects.create(username='creator', password='password')
+        self.client.force_login(self.creator)
+        self.project = ProjectFactory(created_by=self.creator)
+        self.epic = self.create_task()
+        self.subtasks = [self.create_task(issue='SUBTASK', parent_id=self.epic['id']) for _ in range(2)]
+
+    def create_task(self, **kwargs):
+        data = {
+            'assigned_to_id': self.creator.id,
+            'description': 'Count me',
+            'project_id': self.project.id,
+            'title': 'Counted',
+            **kwargs
+        }
+        resp = self.client.post(reverse('task-list'), data, format='json')
+        self.assertEqual(resp.status_code, 201)
+        return resp.json()
+
+    def epic_counts(self):
+        resp = self.client.get(reverse('task-detail', kwargs={'code': self.epic['code']}), format='json')
+        return resp.json()['subtask_count'], resp.json()['subtask_done_count']
+
+    def task_counts(self):
+        resp = self.client.get(reverse('project-detail', kwargs={'pk': self.project.id}), format='json')
+        return {name: count for name, count in resp.json()['task_counts'].items() if count}
+
+    def test_create(self):
+        self.assertEqual(self.epic_counts(), (2, 0))
+        self.assertEqual(self.task_counts(), {'DRAFT': 3})
+
+    def test_status(self):
+        url = reverse('task-status', kwargs={'code': self.subtasks[0]['code']})
+        self.client.patch(url, {'status': 'COMPLETE'}, format='json')
+        self.assertEqual(self.epic_counts(), (2, 1))
+        self.assertEqual(self.task_counts(), {'DRAFT': 2, 'COMPLETE': 1})
+
+    def test_update(self):
+        subtask = self.subtasks[0]
+        data = {
+            'title': subtask['title'],
+            'status': 'COMPLETE',
+            'issue': 'SUBTASK',
+            'parent_id': self.epic['id'],
+            'description': subtask['description'],
+            'assigned_to_id': self.creator.id,
+            'project_id': self.project.id
+        }
+        resp = self.client.put(reverse('task-detail', kwargs={'code': subtask['code']}), data, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.epic_counts(), (2, 1))
+
+        data.update({'issue': 'EPIC', 'parent_id': None, 'status': 'REVIEW'})
+        self.client.put(reverse('task-detail', kwargs={'code': subtask['code']}), data, format='json')
+        self.assertEqual(self.epic_counts(), (1, 0))
+        self.assertEqual(self.task_counts(), {'DRAFT': 2, 'REVIEW': 1})
+
+    def test_delete(self):
+        self.client.delete(reverse('task-detail', kwargs={'code': self.subtasks[0]['code']}))
+        self.assertEqual(self.epic_counts(), (1, 0))
+
+        self.client.delete(reverse('task-detail', kwargs={'code': self.epic['code']}))
+        self.assertEqual(Task.objects.count(), 0)
+        self.assertEqual(self.task_counts(), {})
+
+    def test_stale_instance(self):
+        # Loaded before a concurrent change, the task is counted from its row
+        stale = Task.objects.get(pk=self.subtasks[0]['id'])
+        url = reverse('task-status', kwargs={'code': self.subtasks[0]['code']})
+        self.client.patch(url, {'status': 'REVIEW'}, format='json')
+
+        serializer = TaskStatusSerializer(stale, data={'status': 'COMPLETE'})
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.assertEqual(self.epic_counts(), (2, 1))
+        self.assertEqual(self.task_counts(), {'DRAFT': 2, 'COMPLETE': 1})
+
+    def test_delete_outside_api(self):
+        # As the admin deletes, one task or a queryset of them
+        Task.objects.get(pk=self.subtasks[0]['id']).delete()
+        self.assertEqual(self.epic_counts(), (1, 0))
+        self.assertEqual(self.task_counts(), {'DRAFT': 2})
+
+        Task.objects.filter(pk=self.epic['id']).delete()
+        self.assertEqual(self.task_counts(), {})
+
+    def test_bulk_create(self):
+        data = [{
+            'assigned_to_id': self.creator.id,
+            'description': 'Imported',
+            'project_id': self.project.id,
+            'title': 'Imported',
+            'issue': 'SUBTASK',
+            'parent_id': self.epic['id'],
+            'status': 'COMPLETE'
+        }] * 3
+        self.client.post(reverse('task-bulk'), data, format='json')
+        self.assertEqual(self.epic_counts(), (5, 3))
+        self.assertEqual(self.task_counts(), {'DRAFT': 3, 'COMPLETE': 3})
+
+    def test_rebuild_command(self):
+        ProjectTaskCounter.objects.update(count=10)
+        Task.objects.update(subtask_count=10)
+        call_command('rebuild_task_counters', stdout=StringIO())
+        self.assertEqual(self.epic_counts(), (2, 0))
+        self.assertEqual(self.task_counts(), {'DRAFT': 3})
+
+
+class ProjectStatsTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.creator = User.objects.create(username='creator', password='password')
+        self.assignee = User.objects.create(username='assignee', password='password')
+        self.client.force_login(self.creator)
+        self.project = ProjectFactory(created_by=self.creator)
+        self.url = reverse('project-stats', kwargs={'pk': self.project.id})
+        yesterday = timezone.localdate() - timedelta(days=1)
+
+        epic = TaskFactory(project=self.project, created_by=self.creator, assigned_to=self.assignee,
+                           code='NP-1', due_date=yesterday, status=TaskStatus.IN_PROGRESS)
+        TaskFactory(project=self.project, created_by=self.creator, assigned_to=self.assignee, code='NP-2',
+                    issue=Issue.SUBTASK, parent=epic, due_date=yesterday, status=TaskStatus.COMPLETE)
+        TaskFactory(project=self.project, created_by=self.creator, assigned_to=self.creator, code='NP-3',
+                    issue=Issue.SUBTASK, parent=epic)
+        TaskFactory(project=ProjectFactory(code='EX', created_by=self.creator), created_by=self.creator,
+                    assigned_to=self.creator, code='EX-1')
+
+    def tearDown(self) -> None:
+        cache.clear()
+
+    def test_stats(self):
+        with self.assertNumQueries(5):
+            resp = self.client.get(self.url, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), {
+            'total': 3,
+            'overdue': 1,
+            'by_status': {
+                'DRAFT': 1, 'READY': 0, 'TO_DO': 0, 'IN_PROGRESS': 1, 'REVIEW': 0, 'COMPLETE': 1, 'ARCHIVE': 0
+            },
+            'by_issue': {'EPIC': 1, 'SUBTASK': 2},
+            'workload': [
+                {'assigned_to': {'id': self.creator.id, 'username': 'creator'}, 'total': 1, 'open': 1, 'overdue': 0},
+                {'assigned_to': {'id': self.assignee.id, 'username': 'assignee'}, 'total': 2, 'open': 1, 'overdue': 1},
+            ]
+        })
+
+    def test_other_user(self):
+        self.client.force_login(self.assignee)
+        resp = self.client.get(self.url, format='json')
+        self.assertEqual(resp.status_code, 404)
+
+    @override_settings(UMSEBENZI_STATS_CACHE_TTL=60)
+    def test_cached_stats(self):
+        first = self.client.get(self.url, format='json').json()
+        TaskFactory(project=self.project, created_by=self.creator, assigned_to=self.creator, code='NP-4')
+        with self.assertNumQueries(3):
+            resp = self.client.get(self.url, format='json')
+        self.assertEqual(resp.json(), first)
+
+
+class ConditionalGetTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.creator = User.objects.create(username='creator', password='password')
+        self.client.force_login(self.creator)
+        self.project = ProjectFactory(created_by=self.creator)
+        self.epic = TaskFactory(project=self.project, created_by=self.creator, assigned_to=self.creator)
+        self.subtask = TaskFactory(project=self.project, created_by=self.creator, assigned_to=self.creator,
+                                   issue=Issue.SUBTASK, parent=self.epic, code='NP-2')
+
+    def assertNotModified(self, url, **headers):
+        with self.assertNumQueries(3):
+            resp = self.client.get(url, format='json', headers=headers)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.content, b'')
+
+    def test_task_list(self):
+        url = reverse('task-list')
+        resp = self.client.get(url, format='json')
+        etag = resp['ETag']
+        self.assertNotModified(url, if_none_match=etag)
+
+        self.client.patch(reverse('task-status', kwargs={'code': self.subtask.code}), {'status': 'REVIEW'})
+        resp = self.client.get(url, format='json', headers={'if_none_match': etag})
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp['ETag'], etag)
+
+    def test_task_list_filters(self):
+        url = reverse('task-list')
+        etag = self.client.get(url, format='json')['ETag']
+        resp = self.client.get(f'{url}?project=EX', format='json', headers={'if_none_match': etag})
+        self.assertEqual(resp.status_code, 200)
+
+    def test_task_retrieve(self):
+        url = reverse('task-detail', kwargs={'code': self.epic.code})
+        resp = self.client.get(url, format='json')
+        self.assertNotModified(url, if_none_match=resp['ETag'])
+        self.assertNotModified(url, if_modified_since=resp['Last-Modified'])
+
+    def test_list_not_dated(self):
+        # A deleted task would not move the latest modification of the rows left
+        url = reverse('task-list')
+        resp = self.client.get(url, format='json')
+        self.assertNotIn('Last-Modified', resp)
+        self.subtask.delete()
+        resp = self.client.get(url, format='json', headers={'if_modified_since': http_date(time.time())})
+        self.assertEqual(resp.status_code, 200)
+
+    @patch.object(TaskViewSet, 'renderer_classes', [JSONRenderer, NDJSONRenderer])
+    def test_etag_per_format(self):
+        url = reverse('task-detail', kwargs={'code': self.epic.code})
+        etag = self.client.get(url, format='json')['ETag']
+        resp = self.client.get(url, headers={'accept': 'application/x-ndjson', 'if_none_match': etag})
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp['ETag'], etag)
+
+    def test_project_list(self):
+        url = reverse('project-list')
+        etag = self.client.get(url, format='json')['ETag']
+        self.assertNotModified(url, if_none_match=etag)
+
+        self.subtask.delete()
+        resp = self.client.get(url, format='json', headers={'if_none_match': etag})
+        self.assertEqual(resp.status_code, 200)
+
+
+@override_settings(UMSEBENZI_SYNC_SETTLE_SECONDS=0)
+class TaskChangesTestCase(APITestCase):
+    url = reverse('task-changes')
+
+    def setUp(self) -> None:
+        self.creator = User.objects.create(username='creator', password='password')
+        self.client.force_login(self.creator)
+        self.project = ProjectFactory(created_by=self.creator)
+        self.epic = TaskFactory(project=self.project, created_by=self.creator, assigned_to=self.creator)
+        self.subtask = TaskFactory(project=self.project, created_by=self.creator, assigned_to=self.creator,
+                                   issue=Issue.SUBTASK, parent=self.epic, code='NP-2')
+        TaskFactory(project=self.project, code='NP-3')
+
+    def sync(self, since=None, **params):
+        if since:
+            params['since'] = since
+        resp = self.client.get(self.url, params)
+        self.assertEqual(resp.status_code, 200)
+        return resp.json()
+
+    def test_full_sync(self):
+        changes = self.sync()
+        self.assertEqual([t['code'] for t in changes['changes']], ['NP-1', 'NP-2'])
+        self.assertEqual(changes['removed'], [])
+        self.assertFalse(changes['has_more'])
+
+        changes = self.sync(changes['next'])
+        self.assertEqual(changes['changes'], [])
+
+    def test_modified_and_removed(self):
+        since = self.sync()['next']
+        self.client.patch(reverse('task-status', kwargs={'code': self.subtask.code}), {'status': 'ARCHIVE'})
+        TaskFactory(project=self.project, created_by=self.creator, assigned_to=self.creator, code='NP-4')
+
+        changes = self.sync(since)
+        self.assertEqual([t['code'] for t in changes['changes']], ['NP-4'])
+        self.assertEqual([(t['code'], t['reason']) for t in changes['removed']], [('NP-2', 'archived')])
+
+        since = changes['next']
+        self.client.delete(reverse('task-detail', kwargs={'code': self.epic.code}))
+        changes = self.sync(since)
+        self.assertEqual(changes['changes'], [])
+        self.assertEqual(
+            sorted((t['code'], t['reason']) for t in changes['removed']),
+            [('NP-1', 'deleted'), ('NP-2', 'deleted')]
+        )
+
+    def test_reassigned(self):
+        other = User.objects.create(username='other', password='password')
+        task = TaskFactory(project=self.project, created_by=other, assigned_to=self.creator, code='NP-4')
+        since = self.sync()['next']
+        resp = self.client.put(reverse('task-detail', kwargs={'code': task.code}), {
+            'title': task.title, 'description': task.description, 'assigned_to_id': other.id,
+            'project_id': self.project.id
+        }, format='json')
+        self.assertEqual(resp.status_code, 200)
+
+        changes = self.sync(since)
+        self.assertEqual(changes['changes'], [])
+        self.assertEqual([(t['code'], t['reason']) for t in changes['removed']], [('NP-4', 'reassigned')])
+        # The task is still the other user's
+        self.client.force_login(other)
+        self.assertEqual([t['code'] for t in self.sync(since)['changes']], ['NP-4'])
+        self.assertEqual(self.sync(since)['removed'], [])
+
+        # Reassigned back in the admin, the tombstone is outdated
+        self.client.force_login(self.creator)
+        form = TaskForm(instance=Task.objects.get(pk=task.pk), data={
+            'project': self.project.id, 'title': task.title, 'description': task.description,
+            'status': task.status.value, 'created_by': other.id, 'assigned_to': self.creator.id,
+            'issue': Issue.EPIC.value,
+        })
+        form.save()
+        changes = self.sync(since)
+        self.assertEqual([t['code'] for t in changes['changes']], ['NP-4'])
+        self.assertEqual(changes['removed'], [])
+
+    def test_pages(self):
+        changes = self.sync(limit=1)
+        self.assertEqual([t['code'] for t in changes['changes']], ['NP-1'])
+        self.assertTrue(changes['has_more'])
+
+        changes = self.sync(changes['next'], limit=1)
+        self.assertEqual([t['code'] for t in changes['changes']], ['NP-2'])
+        self.assertFalse(changes['has_more'])
+
+    @override_settings(UMSEBENZI_SYNC_SETTLE_SECONDS=60)
+    def test_settle_window(self):
+        since = self.sync()['next']
+        # Written before the first sync read past it, committed after
+        late = TaskFactory(project=self.project, created_by=self.creator, assigned_to=self.creator, code='NP-4')
+        Task.objects.filter(pk=late.pk).update(modified_at=timezone.now() - timedelta(seconds=10))
+        self.assertIn('NP-4', [t['code'] for t in self.sync(since)['changes']])
+
+        # Pages move forward, only the cursor of the last one is held back
+        codes, changes = [], {'next': None, 'has_more': True}
+        while changes['has_more']:
+            changes = self.sync(changes['next'], limit=1)
+            codes += [t['code'] for t in changes['changes']]
+        self.assertEqual(codes, ['NP-4', 'NP-1', 'NP-2'])
+
+    def test_since_timestamp(self):
+        since = timezone.now().isoformat()
+        self.assertEqual(self.sync(since)['changes'], [])
+
+    def test_invalid_since(self):
+        resp = self.client.get(self.url, {'since': 'invalid'})
+        self.assertEqual(resp.status_code, 400)
+
+
+@override_settings(UMSEBENZI_LIST_CACHE=True)
+class ListCacheTestCase(APITestCase):
+    url = reverse('task-list')
+
+    def setUp(self) -> None:
+        self.creator = User.objects.create(username='creator', password='password')
+        self.assignee = User.objects.create(username='assignee', password='password')
+        self.client.force_login(self.creator)
+        self.project = ProjectFactory(created_by=self.creator)
+        self.epic = TaskFactory(project=self.project, created_by=self.creator, assigned_to=self.assignee)
+
+    def tearDown(self) -> None:
+        cache.clear()
+
+    def get(self, url=None, user=None):
+        if user:
+            self.client.force_login(user)
+        resp = self.client.get(url or self.url, format='json')
+        self.assertEqual(resp.status_code, 200)
+        return resp.json()
+
+    def test_hit(self):
+        stats = list_cache.stats()
+        first = self.get()
+        # Session, user and the ETag aggregate are all that run
+        with self.assertNumQueries(3):
+            self.assertEqual(self.get(), first)
+        self.assertEqual(list_cache.stats()['hits'], stats['hits'] + 1)
+        self.assertEqual(list_cache.stats()['misses'], stats['misses'] + 1)
+
+    def test_stats_shared(self):
+        # Counted in the cache, as another process would see them
+        self.get()
+        self.get()
+        self.assertEqual(cache.get_many([list_cache.counter_key('hits'), list_cache.counter_key('misses')]), {
+            list_cache.counter_key('hits'): 1, list_cache.counter_key('misses'): 1
+        })
+
+    def test_metrics_hook(self):
+        recorded = []
+        with override_settings(UMSEBENZI_METRICS=True, UMSEBENZI_METRICS_HOOK=recorded.append):
+            self.get()
+            self.get()
+        self.assertEqual([metrics['list_cache'] for metrics in recorded], ['miss', 'hit'])
+
+    def test_per_user_and_filters(self):
+        self.get()
+        self.assertEqual(len(self.get(user=self.assignee)), 1)
+        self.assertEqual(self.get(f'{self.url}?project=EX'), [])
+
+    def test_task_change(self):
+        self.get(user=self.assignee)
+        self.client.force_login(self.creator)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('task-status', kwargs={'code': self.epic.code}), {'status': 'REVIEW'})
+        self.assertEqual(self.get(user=self.assignee)[0]['status'], 'REVIEW')
+
+    def test_reassigned(self):
+        self.assertEqual(len(self.get(user=self.assignee)), 1)
+        self.epic.assigned_to = self.creator
+        with self.captureOnCommitCallbacks(execute=True):
+            self.epic.save()
+        self.assertEqual(self.get(user=self.assignee), [])
+
+    def test_invalidated_on_commit(self):
+        self.assertEqual(len(self.get(user=self.assignee)), 1)
+        generation = list_cache.generation(self.assignee.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.epic.assigned_to = self.creator
+                self.epic.save()
+                # A list read before the commit is cached under the old generation
+                self.assertEqual(list_cache.generation(self.assignee.pk), generation)
+        self.assertNotEqual(list_cache.generation(self.assignee.pk), generation)
+        self.assertEqual(self.get(user=self.assignee), [])
+
+    def test_subtask_change(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            TaskFactory(project=self.project, created_by=self.assignee, assigned_to=self.assignee,
+                        issue=Issue.SUBTASK, parent=self.epic, code='NP-2')
+        self.assertEqual(len(self.get()[0]['subtasks']), 1)
+
+    def test_project_change(self):
+        self.get(user=self.assignee)
+        self.project.title = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.save()
+        self.assertEqual(self.get(user=self.assignee)[0]['project']['title'], 'Renamed')
+
+    def test_project_list(self):
+        url = reverse('project-list')
+        self.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('task-bulk'), [{
+                'assigned_to_id': self.assignee.id,
+                'description': 'Imported',
+                'project_id': self.project.id,
+                'title': 'Imported'
+            }], format='json')
+        self.assertEqual(self.get(url)[0]['task_counts']['DRAFT'], 1)
+
+    @override_settings(UMSEBENZI_LIST_CACHE_MAX_SIZE=10)
+    def test_max_size(self):
+        self.get()
+        with self.assertNumQueries(5):
+            self.get()
+
+
+class IndexPlanTestCase(APITestCase):
+    """The task endpoints read the task table through indexes only, never a full scan"""
+
+    def setUp(self) -> None:
+        self.creator = User.objects.create(username='creator', password='password')
+        self.client.force_login(self.creator)
+        self.project = ProjectFactory(created_by=self.creator)
+        self.epic = TaskFactory(project=self.project, created_by=self.creator, assigned_to=UserFactory())
+        TaskFactory(
+            project=self.project, issue=Issue.SUBTASK, parent=self.epic,
+            created_by=self.creator, assigned_to=UserFactory(), code='NP-2'
+        )
+
+    def full_scans(self, sql: str) -> list:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Tiny test tables are cheapest to scan, only fall back to one when no index applies
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute(f'EXPLAIN {sql}')
+                return [row[0] for row in cursor.fetchall() if 'Seq Scan' in row[0]]
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = [row[-1] for row in cursor.fetchall()]
+            # Subquery results, such as window function rows, are scanned but are not tables
+            derived = {step.split(' ', 1)[1] for step in plan if step.startswith(('CO-ROUTINE', 'MATERIALIZE'))}
+            return [step for step in plan if step.startswith('SCAN') and step[len('SCAN '):] not in derived]
+
+    def assertNoFullScans(self, method: str, url: str, data=None):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = getattr(self.client, method)(url, data, format='json')
+        self.assertLess(resp.status_code, 300)
+        selects = [
+            query['sql'] for query in ctx.captured_queries
+            if query['sql'].startswith('SELECT') and 'umsebenzi_task' in query['sql']
+        ]
+        self.assertTrue(selects)
+        for sql in selects:
+            self.assertEqual(self.full_scans(sql), [], sql)
+
+    def test_list(self):
+        url = reverse('task-list')
+        self.assertNoFullScans('get', url)
+        self.assertNoFullScans('get', f'{url}?status={TaskStatus.REVIEW.value}')
+        self.assertNoFullScans('get', f'{url}?project={self.project.code}')
+
+    def test_filters(self):
+        url = reverse('task-list')
+        today = timezone.localdate()
+        for params in (
+            {'status__in': f'{TaskStatus.DRAFT.value},{TaskStatus.REVIEW.value}'},
+            {'assigned_to': self.creator.id},
+            {'due_date__lte': today},
+            {'due_date__gte': today, 'due_date__lte': today + timedelta(days=7)},
+            {'issue': Issue.SUBTASK.value},
+            {'parent': self.epic.id},
+            {'modified_at__gte': timezone.now().isoformat()},
+        ):
+            with self.subTest(**params):
+                self.assertNoFullScans('get', url, params)
+
+    def test_due_date_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('reads the sqlite query plan')
+        queryset = Task.objects.filter(assigned_to=self.creator, issue=Issue.EPIC, due_date__lte=timezone.localdate())
+        plan = queryset.exclude(status=TaskStatus.ARCHIVE).explain()
+        self.assertIn('task_assignee_issue_due', plan)
+
+    def test_board(self):
+        self.assertNoFullScans('get', reverse('task-board'), {'project': self.project.code})
+
+    def test_retrieve(self):
+        self.assertNoFullScans('get', reverse('task-detail', kwargs={'code': self.epic.code}))
+
+    def test_create(self):
+        # Without a counter the project continues from its latest task
+        Project.objects.filter(pk=self.project.pk).update(next_task_number=None)
+        self.assertNoFullScans('post', reverse('task-list'), {
+            'assigned_to_id': self.creator.id,
+            'description': 'New task',
+            'project_id': self.project.id,
+            'title': 'New task'
+        })
+
+
+class VisibilityStrategyTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create(username='creator', password='password')
+        self.client.force_login(self.user)
+        other = UserFactory()
+        project = ProjectFactory(created_by=self.user)
+        created = TaskFactory(project=project, created_by=self.user, assigned_to=other, code='NP-1')
+        TaskFactory(project=project, created_by=other, assigned_to=self.user, code='NP-2')
+        TaskFactory(project=project, created_by=self.user, assigned_to=self.user, code='NP-3')
+        TaskFactory(project=project, created_by=other, assigned_to=other, code='NP-4')
+        TaskFactory(project=project, created_by=self.user, assigned_to=other, code='NP-5', status=TaskStatus.ARCHIVE)
+        TaskFactory(
+            project=project, created_by=other, assigned_to=self.user, code='NP-6',
+            issue=Issue.SUBTASK, parent=created
+        )
+
+    def responses(self):
+        # The list is unordered, only its rows have to match
+        by_code = itemgetter('code')
+        changes = self.client.get(reverse('task-changes'), format='json').json()
+        # The cursor is held back from the current time
+        changes.pop('next')
+        return [
+            sorted(self.client.get(reverse('task-list'), format='json').json(), key=by_code),
+            sorted(self.client.get(f"{reverse('task-list')}?project=NP", format='json').json(), key=by_code),
+            self.client.get(reverse('task-detail', kwargs={'code': 'NP-2'}), format='json').json(),
+            changes,
+        ]
+
+    def test_same_results(self):
+        with override_settings(UMSEBENZI_VISIBILITY_STRATEGY='or'):
+            expected = self.responses()
+        with override_settings(UMSEBENZI_VISIBILITY_STRATEGY='union'):
+            self.assertEqual(self.responses(), expected)
+        self.assertEqual([task['code'] for task in expected[0]], ['NP-1', 'NP-2', 'NP-3'])
+
+    @override_settings(UMSEBENZI_VISIBILITY_STRATEGY='union')
+    def test_union_hides_other_tasks(self):
+        resp = self.client.get(reverse('task-detail', kwargs={'code': 'NP-4'}), format='json')
+        self.assertEqual(resp.status_code, 404)
+
+
+class MetricsTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create(username='creator', password='password')
+        self.client.force_login(self.user)
+        self.task = TaskFactory(created_by=self.user, assigned_to=self.user)
+        self.recorded = []
+
+    def test_disabled(self):
+        resp = self.client.get(reverse('task-list'), format='json')
+        self.assertNotIn('Server-Timing', resp)
+
+    def test_server_timing(self):
+        with override_settings(UMSEBENZI_METRICS=True, UMSEBENZI_METRICS_HOOK=self.recorded.append):
+            with CaptureQueriesContext(connection) as ctx:
+                resp = self.client.get(reverse('task-list'), format='json')
+        self.assertEqual(resp.status_code, 200)
+        timing = resp['Server-Timing']
+        for name in ('db', 'serialize', 'render', 'total'):
+            self.assertIn(f'{name};dur=', timing)
+        self.assertIn(f'desc="{len(ctx.captured_queries)} queries"', timing)
+
+        metrics, = self.recorded
+        self.assertEqual(metrics['view'], 'task-list')
+        self.assertIsNone(metrics['list_cache'])
+        self.assertEqual(metrics['method'], 'GET')
+        self.assertEqual(metrics['status'], 200)
+        self.assertEqual(metrics['queries'], len(ctx.captured_queries))
+        self.assertEqual(metrics['response_bytes'], len(resp.content))
+        self.assertLessEqual(metrics['sql_ms'] + metrics['serialize_ms'], metrics['total_ms'])
+
+    @override_settings(UMSEBENZI_METRICS=True, UMSEBENZI_METRICS_HOOK='umsebenzi.metrics.log_metrics')
+    def test_log_hook(self):
+        url = reverse('task-status', kwargs={'code': self.task.code})
+        with self.assertLogs('umsebenzi.metrics') as logs:
+            self.client.patch(url, {'status': 'REVIEW'}, format='json')
+        self.assertIn('PATCH task-status 200', logs.output[0])
+
+    def test_not_modified(self):
+        url = reverse('task-detail', kwargs={'code': self.task.code})
+        etag = self.client.get(url, format='json')['ETag']
+        with override_settings(UMSEBENZI_METRICS=True, UMSEBENZI_METRICS_HOOK=self.recorded.append):
+            resp = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertIn('Server-Timing', resp)
+        self.assertEqual(self.recorded[0]['status'], 304)
+
+    def test_failing_hook(self):
+        def hook(metrics):
+            raise ConnectionError
+
+        with override_settings(UMSEBENZI_METRICS=True, UMSEBENZI_METRICS_HOOK=hook):
+            with self.assertLogs('umsebenzi.metrics', 'ERROR'):
+                resp = self.client.get(reverse('project-list'), format='json')
+        self.assertEqual(resp.status_code, 200)
+
+
+class TaskExportTestCase(APITestCase):
+    url = reverse('task-export')
+
+    def setUp(self) -> None:
+        self.user = User.objects.create(username='creator', password='password')
+        self.client.force_login(self.user)
+        self.project = ProjectFactory(created_by=self.user)
+        self.epic = TaskFactory(project=self.project, created_by=self.user, assigned_to=self.user, title='Épic, "one"')
+        TaskFactory(
+            project=self.project, created_by=self.user, assigned_to=UserFactory(), code='NP-2',
+            issue=Issue.SUBTASK, parent=self.epic, due_date=timezone.now().date()
+        )
+        TaskFactory(project=self.project, created_by=self.user, assigned_to=self.user, code='NP-3',
+                    status=TaskStatus.ARCHIVE)
+        TaskFactory(created_by=UserFactory(), assigned_to=UserFactory(), code='EX-1', project__code='EX')
+
+    def export(self, format, query=''):
+        resp = self.client.get(f'{self.url}?format={format}{query}')
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        return resp, b''.join(resp.streaming_content).decode()
+
+    def test_ndjson(self):
+        resp, content = self.export('ndjson')
+        self.assertEqual(resp['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertEqual(resp['Content-Disposition'], 'attachment; filename="tasks.ndjson"')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['code'] for row in rows], ['NP-1', 'NP-2', 'NP-3'])
+        epic, subtask, archived = rows
+        self.assertEqual(epic['title'], 'Épic, "one"')
+        self.assertEqual(epic['status'], 'DRAFT')
+        self.assertEqual(epic['project'], 'NP')
+        self.assertEqual(epic['created_by'], 'creator')
+        self.assertIsNone(epic['parent'])
+        self.assertEqual(subtask['parent'], 'NP-1')
+        self.assertEqual(subtask['issue'], 'SUBTASK')
+        self.assertEqual(archived['status'], 'ARCHIVE')
+        # Formatted as the task endpoints format them
+        detail = self.client.get(reverse('task-detail', kwargs={'code': 'NP-2'}), format='json').json()
+        self.assertEqual(subtask['created_at'], detail['created_at'])
+        self.assertEqual(subtask['due_date'], detail['due_date'])
+
+    def test_json(self):
+        _, content = self.export('json')
+        self.assertEqual([row['code'] for row in json.loads(content)], ['NP-1', 'NP-2', 'NP-3'])
+        _, content = self.export('json', '&project=XX')
+        self.assertEqual(json.loads(content), [])
+
+    def test_csv(self):
+        resp, content = self.export('csv', '&status=1')
+        self.assertEqual(resp['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual([row['code'] for row in rows], ['NP-1', 'NP-2'])
+        self.assertEqual(rows[0]['title'], 'Épic, "one"')
+        self.assertEqual(rows[0]['parent'], '')
+
+    def test_chunked(self):
+        with CaptureQueriesContext(connection) as ctx:
+            _, content = self.export('ndjson')
+        self.assertEqual(len(content.splitlines()), 3)
+        # The rows are read in one query, no per row lookups
+        self.assertEqual(sum('umsebenzi_task' in query['sql'] for query in ctx.captured_queries), 1)
+
+    def test_unknown_format(self):
+        self.assertEqual(self.client.get(f'{self.url}?format=xml').status_code, 404)
+
+
+class FastTaskListTestCase(APITestCase):
+    """The fast list rendering has to return the exact bytes TaskSerializer does"""
+
+    def setUp(self) -> None:
+        self.user = User.objects.create(username='creator', password='password', email='creator@example.com')
+        self.client.force_login(self.user)
+        other = UserFactory(email='other@example.com')
+        for code in ('NP', 'ÄB'):
+            project = ProjectFactory(code=code, created_by=self.user)
+            epic = TaskFactory(
+                project=project, created_by=self.user, assigned_to=other, code=f'{code}-1',
+                title='Ünïcode "task"', due_date=timezone.now().date(), status=TaskStatus.REVIEW
+            )
+            for number, status in ((2, TaskStatus.COMPLETE), (3, TaskStatus.ARCHIVE)):
+                TaskFactory(
+                    project=project, created_by=other, assigned_to=self.user, code=f'{code}-{number}',
+                    issue=Issue.SUBTASK, parent=epic, status=status
+                )
+            TaskFactory(project=project, created_by=other, assigned_to=self.user, code=f'{code}-4')
+        rebuild_counters()
+
+    def assertSameContent(self, url):
+        with override_settings(UMSEBENZI_FAST_TASK_LIST=False):
+            expected = self.client.get(url)
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.content, expected.content)
+        return resp
+
+    def test_list(self):
+        resp = self.assertSameContent(reverse('task-list'))
+        self.assertEqual(len(resp.json()), 4)
+        self.assertEqual(len(resp.json()[0]['subtasks']), 2)
+
+    def test_variants(self):
+        url = reverse('task-list')
+        self.assertSameContent(f'{url}?project=NP')
+        self.assertSameContent(f'{url}?status={TaskStatus.REVIEW.value}')
+        self.assertSameContent(f'{url}?format=json')
+        self.assertSameContent(f'{url}?page_size=2')
+        self.assertSameContent(f'{url}.json')
+
+    @override_settings(TIME_ZONE='Africa/Johannesburg')
+    def test_time_zone(self):
+        self.assertSameContent(reverse('task-list'))
+
+    def test_query_count(self):
+        url = reverse('task-list')
+        with override_settings(UMSEBENZI_FAST_TASK_LIST=False), CaptureQueriesContext(connection) as ctx:
+            self.client.get(url)
+        with self.assertNumQueries(len(ctx.captured_queries)):
+            self.client.get(url)
+
+
+class BulkStatusTestCase(APITestCase):
+    url = reverse('task-bulk-status')
+
+    def setUp(self) -> None:
+        self.user = User.objects.create(username='creator', password='password')
+        self.client.force_login(self.user)
+        self.project = ProjectFactory(created_by=self.user)
+        self.epic = TaskFactory(project=self.project, created_by=self.user, assigned_to=self.user,
+                                status=TaskStatus.TO_DO)
+        self.subtask = TaskFactory(
+            project=self.project, created_by=self.user, assigned_to=self.user, code='NP-2',
+            issue=Issue.SUBTASK, parent=self.epic, status=TaskStatus.TO_DO
+        )
+        self.done = TaskFactory(project=self.project, created_by=self.user, assigned_to=self.user, code='NP-3',
+                                status=TaskStatus.COMPLETE)
+        self.hidden = TaskFactory(created_by=UserFactory(), assigned_to=UserFactory(), code='EX-1',
+                                  project__code='EX', status=TaskStatus.TO_DO)
+        rebuild_counters()
+
+    def patch(self, data):
+        return self.client.patch(self.url, data, format='json')
+
+    def test_codes(self):
+        before = Task.objects.get(pk=self.epic.pk).modified_at
+        resp = self.patch({'codes': ['NP-1', 'NP-2', 'NP-3', 'EX-1', 'NP-99'], 'status': 'COMPLETE'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), {
+            'status': 'COMPLETE',
+            'updated': 2,
+            'results': [
+                {'code': 'NP-1', 'result': 'updated'},
+                {'code': 'NP-2', 'result': 'updated'},
+                {'code': 'NP-3', 'result': 'unchanged'},
+                {'code': 'EX-1', 'result': 'not_found'},
+                {'code': 'NP-99', 'result': 'not_found'},
+            ]
+        })
+        epic = Task.objects.get(pk=self.epic.pk)
+        self.assertEqual(epic.status, TaskStatus.COMPLETE)
+        self.assertGreater(epic.modified_at, before)
+        self.assertEqual(Task.objects.get(pk=self.hidden.pk).status, TaskStatus.TO_DO)
+        self.assertEqual(epic.subtask_done_count, 1)
+        counts = dict(self.project.task_counters.values_list('status', 'count'))
+        self.assertEqual(counts[TaskStatus.COMPLETE], 3)
+        self.assertEqual(counts[TaskStatus.TO_DO], 0)
+
+    def test_filter(self):
+        resp = self.patch({'filter': {'project': 'NP', 'status': TaskStatus.TO_DO.value}, 'status': 'IN_PROGRESS'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()['results'], [
+            {'code': 'NP-1', 'result': 'updated'},
+            {'code': 'NP-2', 'result': 'updated'},
+        ])
+        self.assertEqual(Task.objects.get(pk=self.hidden.pk).status, TaskStatus.TO_DO)
+
+    def test_query_count(self):
+        codes = ['NP-1', 'NP-2', 'NP-3']
+        # Session, user, then a savepoint with the locking read, the UPDATE, two counter queries
+        # and the transition history
+        with self.assertNumQueries(9):
+            self.patch({'codes': codes, 'status': 'REVIEW'})
+
+    def test_invalid(self):
+        self.assertEqual(self.patch({'status': 'REVIEW'}).status_code, 400)
+        self.assertEqual(self.patch({'codes': ['NP-1'], 'filter': {}, 'status': 'REVIEW'}).status_code, 400)
+        self.assertEqual(self.patch({'codes': [], 'status': 'REVIEW'}).status_code, 400)
+        self.assertEqual(self.patch({'codes': ['NP-1'], 'status': 'DONE'}).status_code, 400)
+        resp = self.patch({'filter': {'status': 'DONE'}, 'status': 'REVIEW'})
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('filter', resp.json())
+
+    def test_empty_or_unknown_filter(self):
+        self.assertEqual(self.patch({'filter': {}, 'status': 'ARCHIVE'}).status_code, 400)
+        resp = self.patch({'filter': {'projet': 'NP'}, 'status': 'ARCHIVE'})
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json(), {'filter': ['Unknown filters: projet']})
+        self.assertFalse(Task.objects.filter(status=TaskStatus.ARCHIVE).exists())
+
+    def test_too_many(self):
+        with patch.object(BulkStatusSerializer, 'max_tasks', 1):
+            resp = self.patch({'filter': {'project': 'NP'}, 'status': 'REVIEW'})
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(Task.objects.get(pk=self.epic.pk).status, TaskStatus.TO_DO)
+
+    @override_settings(UMSEBENZI_LIST_CACHE=True)
+    def test_list_cache(self):
+        self.addCleanup(cache.clear)
+        list_url = reverse('task-list')
+        self.client.get(list_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.patch({'codes': ['NP-1'], 'status': 'REVIEW'})
+        statuses = {task['code']: task['status'] for task in self.client.get(list_url).json()}
+        self.assertEqual(statuses['NP-1'], 'REVIEW')
+
+    def test_detail_still_routed(self):
+        url = reverse('task-status', kwargs={'code': 'NP-1'})
+        self.assertEqual(self.client.patch(url, {'status': 'REVIEW'}, format='json').status_code, 200)
+
+
+@override_settings(UMSEBENZI_STATUS_TRANSITIONS=WORKFLOW)
+class StatusTransitionTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create(username='creator', password='password')
+        self.client.force_login(self.user)
+        self.project = ProjectFactory(created_by=self.user)
+        self.task = TaskFactory(project=self.project, created_by=self.user, assigned_to=self.user)
+        self.url = reverse('task-status', kwargs={'code': self.task.code})
+
+    def test_rejected(self):
+        resp = self.client.patch(self.url, {'status': 'COMPLETE'}, format='json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json(), {'status': [{
+            'code': 'invalid_transition',
+            'message': 'A DRAFT task cannot move to COMPLETE',
+            'from': 'DRAFT',
+            'to': 'COMPLETE',
+            'allowed': ['READY', 'ARCHIVE'],
+        }]})
+        self.assertEqual(Task.objects.get(pk=self.task.pk).status, TaskStatus.DRAFT)
+        self.assertFalse(TaskStatusTransition.objects.exists())
+
+    def test_allowed(self):
+        for status in ('READY', 'TO_DO', 'IN_PROGRESS'):
+            resp = self.client.patch(self.url, {'status': status}, format='json')
+            self.assertEqual(resp.status_code, 200)
+        history = TaskStatusTransition.objects.filter(task=self.task).order_by('id')
+        self.assertEqual(
+            [(t.from_status, t.to_status, t.changed_by_id) for t in history],
+            [
+                (TaskStatus.DRAFT, TaskStatus.READY, self.user.id),
+                (TaskStatus.READY, TaskStatus.TO_DO, self.user.id),
+                (TaskStatus.TO_DO, TaskStatus.IN_PROGRESS, self.user.id),
+            ]
+        )
+
+    def test_same_status(self):
+        resp = self.client.patch(self.url, {'status': 'DRAFT'}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(TaskStatusTransition.objects.exists())
+
+    def test_update(self):
+        url = reverse('task-detail', kwargs={'code': self.task.code})
+        data = {
+            'title': 'Updated', 'description': 'Updated', 'project_id': self.project.id,
+            'assigned_to_id': self.user.id, 'issue': 'EPIC', 'status': 'REVIEW'
+        }
+        resp = self.client.put(url, data, format='json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json()['status'][0]['code'], 'invalid_transition')
+        resp = self.client.put(url, {**data, 'status': 'READY'}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(TaskStatusTransition.objects.get().to_status, TaskStatus.READY)
+
+    def test_update_without_status(self):
+        self.task.status = TaskStatus.IN_PROGRESS
+        self.task.save()
+        url = reverse('task-detail', kwargs={'code': self.task.code})
+        resp = self.client.put(url, {
+            'title': 'Updated', 'description': 'Updated', 'project_id': self.project.id,
+            'assigned_to_id': self.user.id
+        }, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()['status'], 'IN_PROGRESS')
+        self.assertFalse(TaskStatusTransition.objects.exists())
+
+    def test_bulk(self):
+        TaskFactory(project=self.project, created_by=self.user, assigned_to=self.user, code='NP-2',
+                    status=TaskStatus.READY)
+        resp = self.client.patch(reverse('task-bulk-status'), {'codes': ['NP-1', 'NP-2'], 'status': 'TO_DO'},
+                                 format='json')
+        self.assertEqual(resp.json()['results'], [
+            {'code': 'NP-1', 'result': 'invalid_transition'},
+            {'code': 'NP-2', 'result': 'updated'},
+        ])
+        self.assertEqual(Task.objects.get(pk=self.task.pk).status, TaskStatus.DRAFT)
+        self.assertEqual(TaskStatusTransition.objects.get().task.code, 'NP-2')
+
+    def test_no_extra_queries(self):
+        with override_settings(UMSEBENZI_STATUS_TRANSITIONS=None), CaptureQueriesContext(connection) as ctx:
+            self.client.patch(self.url, {'status': 'READY'}, format='json')
+        with self.assertNumQueries(len(ctx.captured_queries)):
+            self.client.patch(self.url, {'status': 'TO_DO'}, format='json')
+
+    @override_settings(UMSEBENZI_STATUS_TRANSITIONS=None)
+    def test_disabled(self):
+        resp = self.client.patch(self.url, {'status': 'COMPLETE'}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(TaskStatusTransition.objects.get().to_status, TaskStatus.COMPLETE)
+
+    @override_settings(UMSEBENZI_STATUS_TRANSITIONS={'DONE': []})
+    def test_misconfigured(self):
+        with self.assertRaises(ImproperlyConfigured):
+            get_transitions()
+
+
+class ProjectAnalyticsTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create(username='creator', password='password')
+        self.client.force_login(self.user)
+        self.project = ProjectFactory(created_by=self.user)
+        self.url = reverse('project-analytics', kwargs={'pk': self.project.pk})
+        self.since = week_start(4)
+
+    def log(self, task, from_status, to_status, at, project=None):
+        with patch('django.utils.timezone.now', return_value=at):
+            return TaskStatusTransition.objects.create(
+                task=task, project=project or task.project, from_status=from_status, to_status=to_status
+            )
+
+    def complete(self, lead: timedelta, cycle: timedelta = None, created=None, project=None):
+        project = project or self.project
+        task = TaskFactory(project=project, created_by=self.user, assigned_to=self.user,
+                           code=f'{project.code}-{Task.objects.count() + 1}')
+        created = created or self.since
+        self.log(task, None, TaskStatus.DRAFT, created)
+        if cycle is not None:
+            self.log(task, TaskStatus.TO_DO, TaskStatus.IN_PROGRESS, created + lead - cycle)
+        self.log(task, TaskStatus.REVIEW, TaskStatus.COMPLETE, created + lead)
+        return task
+
+    def test_analytics(self):
+        day = timedelta(days=1)
+        self.complete(1 * day, day / 2)
+        self.complete(2 * day, 1.5 * day).delete()
+        self.complete(3 * day, 2.5 * day)
+        self.complete(8 * day)
+        # Completed before the period and in another project
+        self.complete(day, created=self.since - 3 * day)
+        self.complete(day, project=ProjectFactory(created_by=self.user, code='OT'))
+
+        resp = self.client.get(self.url, {'weeks': 4})
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertEqual(data['lead_time'], {
+            'count': 4, 'p50': 2 * 86400.0, 'p85': 8 * 86400.0, 'p95': 8 * 86400.0
+        })
+        self.assertEqual(data['cycle_time'], {
+            'count': 3, 'p50': 1.5 * 86400.0, 'p85': 2.5 * 86400.0, 'p95': 2.5 * 86400.0
+        })
+        self.assertEqual([week['completed'] for week in data['throughput']], [3, 1, 0, 0])
+        self.assertEqual(data['throughput'][0]['week'], self.since.date().isoformat())
+
+    def test_empty(self):
+        data = self.client.get(self.url).json()
+        self.assertEqual(data['lead_time'], {'count': 0, 'p50': None, 'p85': None, 'p95': None})
+        self.assertEqual(len(data['throughput']), 12)
+        self.assertEqual(len(self.client.get(self.url, {'weeks': 1000}).json()['throughput']), 104)
+
+    def test_query_count(self):
+        day = timedelta(days=1)
+        for i in range(1, 6):
+            self.complete(i * day, day)
+        # session, user, project, a count and the percentiles of lead and cycle time, throughput
+        with self.assertNumQueries(8):
+            self.client.get(self.url)
+
+    def test_creation_logged(self):
+        resp = self.client.post(reverse('task-list'), {
+            'title': 'Logged',
+            'description': 'Creation is logged',
+            'project_id': self.project.pk,
+            'assigned_to_id': self.user.pk
+        }, format='json')
+        self.assertEqual(resp.status_code, 201)
+        event = TaskStatusTransition.objects.get()
+        self.assertEqual(
+            (event.task_id, event.project_id, event.from_status, event.to_status, event.changed_by_id),
+            (resp.json()['id'], self.project.pk, None, TaskStatus.DRAFT, self.user.pk)
+        )
+
+    def test_append_only(self):
+        task = TaskFactory(project=self.project, created_by=self.user, assigned_to=self.user)
+        event = self.log(task, None, TaskStatus.DRAFT, self.since)
+        with self.assertRaises(AppendOnlyException):
+            event.save()
+        with self.assertRaises(AppendOnlyException):
+            event.delete()
+        with self.assertRaises(AppendOnlyException):
+            TaskStatusTransition.objects.update(to_status=TaskStatus.READY)
+        with self.assertRaises(AppendOnlyException):
+            TaskStatusTransition.objects.all().delete()
+        task.delete()
+        self.assertTrue(TaskStatusTransition.objects.exists())
+        self.project.delete()
+        self.assertFalse(TaskStatusTransition.objects.exists())
+
+
+class TaskSearchTestCase(APITestCase):
+    url = reverse('task-list')
+
+    def setUp(self) -> None:
+        self.user = User.objects.create(username='creator', password='password')
+        self.client.force_login(self.user)
+        self.project = ProjectFactory(created_by=self.user)
+        self.tasks = {}
+        for number, (title, description) in enumerate([
+            ('Fix the login page', 'Users cannot sign in'),
+            ('Write release notes', 'Mention the login fix'),
+            ('Plan the sprint', 'Nothing about it'),
+        ], start=1):
+            self.add_task(number, title, description)
+
+    def add_task(self, number, title, description, **kwargs):
+        kwargs.setdefault('created_by', self.user)
+        kwargs.setdefault('assigned_to', self.user)
+        self.tasks[number] = TaskFactory(
+            project=self.project, code=f'NP-{number}',
+            title=title, description=description, **kwargs
+        )
+        return self.tasks[number]
+
+    def search(self, q, **params):
+        resp = self.client.get(self.url, {'q': q, **params})
+        self.assertEqual(resp.status_code, 200)
+        return resp.json()
+
+    def codes(self, q):
+        return [task['code'] for task in self.search(q)]
+
+    def test_ranked(self):
+        # Titles weigh more than descriptions, stemming matches fixes and fix
+        self.assertEqual(self.codes('login'), ['NP-1', 'NP-2'])
+        self.assertEqual(self.codes('fixes'), ['NP-1', 'NP-2'])
+        self.assertEqual(self.codes('login release'), ['NP-2'])
+        self.assertEqual(self.codes('deploy'), [])
+        self.assertEqual(self.codes('"(*'), [])
+
+    def test_visible_tasks_only(self):
+        self.add_task(4, 'Another login bug', 'Hidden', created_by=UserFactory(), assigned_to=UserFactory())
+        self.assertEqual(self.codes('login'), ['NP-1', 'NP-2'])
+
+    def test_kept_in_sync(self):
+        task = self.tasks[3]
+        task.title = 'Login audit'
+        task.save()
+        self.tasks[1].delete()
+        Task.objects.filter(pk=self.tasks[2].pk).update(description='Nothing to see')
+        self.assertEqual(self.codes('login'), ['NP-3'])
+
+        resp = self.client.post(reverse('task-bulk'), [{
+            'title': 'Login rate limit',
+            'description': 'Throttle attempts',
+            'project_id': self.project.pk,
+            'assigned_to_id': self.user.pk,
+        }], format='json')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(self.codes('throttle'), [resp.json()[0]['code']])
+
+    def test_pagination(self):
+        for number in range(4, 9):
+            self.add_task(number, f'Login task {number}', 'More login work')
+        expected = self.codes('login')
+        self.assertEqual(len(expected), 7)
+        codes, url = [], f'{self.url}?q=login&page_size=3'
+        while url:
+            page = self.client.get(url).json()
+            codes += [task['code'] for task in page['results']]
+            url = page['next']
+        self.assertEqual(codes, expected)
+
+    def test_repair(self):
+        # A migration that rebuilds the task table drops the triggers
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER umsebenzi_task_fts_insert')
+        self.add_task(4, 'Login while unindexed', 'Added without the trigger')
+        install_fts(connection, repair=True)
+        self.assertIn('NP-4', self.codes('unindexed'))
+
+    def test_connection_warm_up(self):
+        with patch('umsebenzi.signals.connect_fts') as connect:
+            load_search_table(sender=None, connection=connection)
+            connect.assert_called_once_with(connection)
+        # Databases tasks are not migrated to are left alone
+        with patch('umsebenzi.signals.connect_fts') as connect, \
+                patch('umsebenzi.signals.router.allow_migrate_model', return_value=False):
+            load_search_table(sender=None, connection=connection)
+            connect.assert_not_called()
+
+
+class TaskFilterTestCase(APITestCase):
+    url = reverse('task-list')
+
+    def setUp(self) -> None:
+        self.user = User.objects.create(username='creator', password='password')
+        self.client.force_login(self.user)
+        self.other = UserFactory()
+        project = ProjectFactory(created_by=self.user)
+        today = timezone.localdate()
+        self.epic = TaskFactory(project=project, created_by=self.user, assigned_to=self.other, code='NP-1',
+                                due_date=today - timedelta(days=1), status=TaskStatus.IN_PROGRESS)
+        TaskFactory(project=project, created_by=self.other, assigned_to=self.user, code='NP-2',
+                    due_date=today + timedelta(days=3), status=TaskStatus.TO_DO)
+        TaskFactory(project=project, created_by=self.user, assigned_to=self.user, code='NP-3')
+        TaskFactory(project=project, created_by=self.user, assigned_to=self.user, code='NP-4',
+                    issue=Issue.SUBTASK, parent=self.epic, due_date=today)
+
+    def codes(self, **params):
+        resp = self.client.get(self.url, params)
+        self.assertEqual(resp.status_code, 200, resp.content)
+        return sorted(task['code'] for task in resp.json())
+
+    def test_status_in(self):
+        statuses = f'{TaskStatus.IN_PROGRESS.value},{TaskStatus.TO_DO.value}'
+        self.assertEqual(self.codes(status__in=statuses), ['NP-1', 'NP-2'])
+
+    def test_assigned_to(self):
+        self.assertEqual(self.codes(assigned_to=self.user.id), ['NP-2', 'NP-3'])
+
+    def test_due_date(self):
+        today = timezone.localdate()
+        self.assertEqual(self.codes(due_date__lte=today), ['NP-1'])
+        self.assertEqual(self.codes(due_date__gte=today), ['NP-2'])
+        self.assertEqual(self.codes(due_date__gte=today, due_date__lte=today + timedelta(days=7)), ['NP-2'])
+
+    def test_subtasks(self):
+        # Subtasks are only listed on their own when filtered for
+        self.assertEqual(self.codes(issue=Issue.SUBTASK.value), ['NP-4'])
+        self.assertEqual(self.codes(parent=self.epic.id), ['NP-4'])
+        self.assertEqual(self.codes(issue=Issue.EPIC.value), ['NP-1', 'NP-2', 'NP-3'])
+
+    def test_modified_at(self):
+        later = timezone.now() + timedelta(minutes=1)
+        Task.objects.filter(code='NP-3').update(modified_at=later)
+        self.assertEqual(self.codes(modified_at__gte=later.isoformat()), ['NP-3'])
+
+    def test_invalid(self):
+        resp = self.client.get(self.url, {'due_date__lte': 'soon'})
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('due_date__lte', resp.json())
+
+
+class TaskTreeTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create(username='creator', password='password', email='creator@example.com')
+        self.client.force_login(self.user)
+        self.project = ProjectFactory(created_by=self.user)
+        self.epic = TaskFactory(project=self.project, created_by=self.user, assigned_to=self.user, code='NP-1')
+        yesterday = timezone.localdate() - timedelta(days=1)
+        for number, status, due_date in (
+            (2, TaskStatus.IN_PROGRESS, yesterday),
+            (3, TaskStatus.COMPLETE, yesterday),
+            (4, TaskStatus.TO_DO, None),
+        ):
+            self.add_subtask(number, status=status, due_date=due_date)
+        self.url = reverse('task-tree', kwargs={'code': self.epic.code})
+
+    def add_subtask(self, number, **kwargs):
+        return TaskFactory(
+            project=self.project, created_by=self.user, assigned_to=UserFactory(), code=f'NP-{number}',
+            issue=Issue.SUBTASK, parent=self.epic, **kwargs
+        )
+
+    def test_tree(self):
+        resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertEqual(data['code'], 'NP-1')
+        self.assertEqual(data['project']['code'], 'NP')
+        self.assertEqual(data['created_by'], {'id': self.user.id, 'username': 'creator', 'email': 'creator@example.com'})
+        self.assertEqual([task['code'] for task in data['subtasks']], ['NP-2', 'NP-3', 'NP-4'])
+        subtask = Task.objects.get(code='NP-2')
+        self.assertEqual(data['subtasks'][0]['assigned_to']['username'], subtask.assigned_to.username)
+        self.assertEqual(data['subtasks'][0]['status'], 'IN_PROGRESS')
+        self.assertTrue(data['subtasks'][0]['url'].endswith(reverse('task-detail', kwargs={'code': 'NP-2'})))
+        self.assertEqual(data['rollup'], {
+            'total': 3,
+            'open': 2,
+            'done': 1,
+            'overdue': 1,
+            'by_status': {
+                'DRAFT': 0, 'READY': 0, 'TO_DO': 1, 'IN_PROGRESS': 1, 'REVIEW': 0, 'COMPLETE': 1, 'ARCHIVE': 0
+            },
+        })
+
+    def test_subtask(self):
+        data = self.client.get(reverse('task-tree', kwargs={'code': 'NP-2'})).json()
+        self.assertEqual(data['parent'], self.epic.id)
+        self.assertEqual(data['subtasks'], [])
+        self.assertEqual(data['rollup']['total'], 0)
+
+    def test_query_count(self):
+        # session, user, the task and its subtasks, however many there are
+        with self.assertNumQueries(4):
+            self.client.get(self.url)
+        for number in range(5, 25):
+            self.add_subtask(number)
+        with self.assertNumQueries(4):
+            resp = self.client.get(self.url)
+        self.assertEqual(resp.json()['rollup']['total'], 23)
+
+    def test_not_visible(self):
+        self.client.force_login(UserFactory())
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class SparseFieldsTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create(username='creator', password='password')
+        self.client.force_login(self.user)
+        self.project = ProjectFactory(created_by=self.user)
+        self.epic = TaskFactory(project=self.project, created_by=self.user, assigned_to=self.user)
+        self.subtask = TaskFactory(
+            project=self.project, created_by=self.user, assigned_to=UserFactory(), code='NP-2',
+            issue=Issue.SUBTASK, parent=self.epic
+        )
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url, params)
+        self.assertEqual(resp.status_code, 200, resp.content)
+        return resp.json(), [query['sql'] for query in ctx.captured_queries]
+
+    def test_task_fields(self):
+        tasks, queries = self.get(reverse('task-list'), fields='code,title,status')
+        self.assertEqual(tasks, [{'code': 'NP-1', 'title': 'First Task', 'status': 'DRAFT'}])
+        # No joins, no subtasks and no unrequested columns
+        selects = [sql for sql in queries if sql.startswith('SELECT "umsebenzi_task"."id"')]
+        self.assertEqual(len(selects), 1)
+        self.assertNotIn('JOIN', selects[0])
+        self.assertNotIn('description', selects[0])
+
+    def test_task_expand(self):
+        url = reverse('task-detail', kwargs={'code': 'NP-1'})
+        task, queries = self.get(url, expand='project')
+        self.assertEqual(task['project']['code'], 'NP')
+        self.assertEqual(task['assigned_to'], self.user.id)
+        self.assertEqual(task['created_by'], self.user.id)
+        self.assertEqual(task['subtasks'], [self.subtask.id])
+        self.assertFalse(any('auth_user' in sql for sql in queries[2:]))
+
+        task, _ = self.get(url, fields='code,subtasks', expand='subtasks')
+        self.assertEqual(list(task), ['code', 'subtasks'])
+        self.assertEqual(task['subtasks'][0]['code'], 'NP-2')
+
+    def test_unchanged_without_parameters(self):
+        full, _ = self.get(reverse('task-detail', kwargs={'code': 'NP-1'}))
+        every, _ = self.get(
+            reverse('task-detail', kwargs={'code': 'NP-1'}),
+            fields=','.join(full), expand='project,assigned_to,created_by,subtasks'
+        )
+        self.assertEqual(every, full)
+
+    def test_fewer_queries(self):
+        _, full = self.get(reverse('project-list'))
+        projects, sparse = self.get(reverse('project-list'), fields='id,code')
+        self.assertEqual(projects, [{'id': self.project.id, 'code': 'NP'}])
+        # The task counters are not prefetched
+        self.assertEqual(len(sparse), len(full) - 1)
+        projects, _ = self.get(reverse('project-list'), expand='')
+        self.assertEqual(projects[0]['created_by'], self.user.id)
+
+    def test_unknown_fields(self):
+        resp = self.client.get(reverse('task-list'), {'fields': 'code,secret', 'expand': 'title'})
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json(), {'fields': ['Unknown fields: secret']})
+        resp = self.client.get(reverse('task-list'), {'expand': 'title'})
+        self.assertEqual(resp.json(), {'expand': ['Unknown fields: title']})
+
+    def test_writes_unaffected(self):
+        url = reverse('task-status', kwargs={'code': 'NP-1'})
+        resp = self.client.patch(f'{url}?fields=code', {'status': 'READY'}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()['status'], 'READY')
+
+
+class TaskBoardTestCase(APITestCase):
+    url = reverse('task-board')
+
+    def setUp(self) -> None:
+        self.user = User.objects.create(username='creator', password='password')
+        self.client.force_login(self.user)
+        self.project = ProjectFactory(created_by=self.user)
+        other = ProjectFactory(created_by=self.user, code='OT')
+        now = timezone.now()
+        statuses = [TaskStatus.TO_DO] * 4 + [TaskStatus.REVIEW] * 2 + [TaskStatus.ARCHIVE]
+        for number, status in enumerate(statuses, start=1):
+            TaskFactory(project=self.project, created_by=self.user, assigned_to=self.user,
+                        code=f'NP-{number}', status=status)
+            Task.objects.filter(code=f'NP-{number}').update(modified_at=now - timedelta(minutes=number))
+        TaskFactory(project=other, created_by=self.user, assigned_to=self.user, code='OT-1', status=TaskStatus.TO_DO)
+        TaskFactory(project=self.project, code='NP-99', status=TaskStatus.TO_DO)
+
+    def board(self, **params):
+        resp = self.client.get(self.url, params)
+        self.assertEqual(resp.status_code, 200, resp.content)
+        return {
+            column['status']: (column['total'], [task['code'] for task in column['tasks']])
+            for column in resp.json()['columns']
+        }
+
+    def test_board(self):
+        self.assertEqual(self.board(project='NP', limit=2), {
+            'DRAFT': (0, []),
+            'READY': (0, []),
+            'TO_DO': (4, ['NP-1', 'NP-2']),
+            'IN_PROGRESS': (0, []),
+            'REVIEW': (2, ['NP-5', 'NP-6']),
+            'COMPLETE': (0, []),
+        })
+        # OT-1 changed last
+        self.assertEqual(self.board()['TO_DO'], (5, ['OT-1', 'NP-1', 'NP-2', 'NP-3', 'NP-4']))
+
+    def test_card(self):
+        card = self.client.get(self.url, {'project': 'NP', 'limit': 1}).json()['columns'][2]['tasks'][0]
+        self.assertEqual(card['code'], 'NP-1')
+        self.assertEqual(card['status'], 'TO_DO')
+        self.assertEqual(card['issue'], 'EPIC')
+        self.assertEqual(card['assigned_to'], {'id': self.user.id, 'username': 'creator'})
+
+    def test_limit(self):
+        self.assertEqual(self.client.get(self.url, {'limit': 1000}).json()['limit'], 100)
+        self.assertEqual(self.client.get(self.url, {'limit': 'all'}).json()['limit'], 20)
+
+    def test_single_query(self):
+        # session, user and the board
+        with self.assertNumQueries(3):
+            self.client.get(self.url, {'project': 'NP'})
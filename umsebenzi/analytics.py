@@ -0,0 +1,85 @@
+"""
+Lead time, cycle time and throughput of a project, computed in the database
+from the TaskStatusTransition log.
+
+Lead time runs from a task's creation to its last completion, cycle time from
+the first time it went IN_PROGRESS to its last completion.
+"""
+import math
+from datetime import datetime, timedelta
+
+from django.db.models import Count, DateTimeField, DurationField, ExpressionWrapper, F, Max, Min, Q, Window
+from django.db.models.functions import RowNumber, TruncWeek
+from django.utils import timezone
+
+from umsebenzi.enums import TaskStatus
+from umsebenzi.models import Project, TaskStatusTransition
+
+PERCENTILES = (50, 85, 95)
+
+
+def week_start(weeks: int) -> datetime:
+    """Midnight of the monday `weeks - 1` weeks before the current week"""
+    today = timezone.localdate()
+    monday = today - timedelta(days=today.weekday(), weeks=weeks - 1)
+    return timezone.make_aware(datetime.combine(monday, datetime.min.time()))
+
+
+def task_durations(project: Project, since: datetime):
+    """One row per task completed since `since`, with its lead and cycle time"""
+    completed = TaskStatusTransition.objects.filter(
+        project=project, to_status=TaskStatus.COMPLETE, changed_at__gte=since
+    ).values('task')
+    return TaskStatusTransition.objects.filter(project=project, task__in=completed).values('task').annotate(
+        created=Min('changed_at', filter=Q(from_status__isnull=True)),
+        started=Min('changed_at', filter=Q(to_status=TaskStatus.IN_PROGRESS)),
+        completed=Max('changed_at', filter=Q(to_status=TaskStatus.COMPLETE)),
+    ).annotate(
+        lead=ExpressionWrapper(F('completed') - F('created'), output_field=DurationField()),
+        cycle=ExpressionWrapper(F('completed') - F('started'), output_field=DurationField()),
+    ).order_by()
+
+
+def percentiles(durations, metric: str) -> dict:
+    """
+    The number of tasks with the metric and its nearest rank percentiles in seconds.
+    Only the rows at the percentile ranks are fetched, numbered by a window function
+    over the sorted durations.
+    """
+    durations = durations.filter(**{f'{metric}__isnull': False})
+    # Counted on its own, aggregate() over the grouped rows loses the duration annotations
+    count = durations.count()
+    ranks = {p: math.ceil(p * count / 100) for p in PERCENTILES}
+    values = {}
+    if count:
+        rows = durations.annotate(
+            row=Window(RowNumber(), order_by=[F(metric).asc(), F('task').asc()])
+        ).filter(row__in=set(ranks.values())).values_list('row', metric)
+        values = {row: duration.total_seconds() for row, duration in rows}
+    return {'count': count, **{f'p{p}': values.get(rank) for p, rank in ranks.items()}}
+
+
+def get_project_analytics(project: Project, weeks: int = 12) -> dict:
+    """
+    Lead and cycle time percentiles of the tasks completed in the last `weeks`
+    weeks, counting the current one, and the number of tasks completed each week.
+    """
+    since = week_start(weeks)
+    durations = task_durations(project, since)
+    throughput = TaskStatusTransition.objects.filter(
+        project=project, to_status=TaskStatus.COMPLETE, changed_at__gte=since
+    ).annotate(
+        week=TruncWeek('changed_at', output_field=DateTimeField())
+    ).order_by().values('week').annotate(completed=Count('task', distinct=True))
+    completed = {timezone.localtime(row['week']).date(): row['completed'] for row in throughput}
+
+    first = since.date()
+    return {
+        'since': since,
+        'lead_time': percentiles(durations, 'lead'),
+        'cycle_time': percentiles(durations, 'cycle'),
+        'throughput': [
+            {'week': week, 'completed': completed.get(week, 0)}
+            for week in (first + timedelta(weeks=i) for i in range(weeks))
+        ],
+    }
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class UmsebenziConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'umsebenzi'
+
+    def ready(self):
+        from umsebenzi import signals  # noqa: F401
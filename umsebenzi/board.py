@@ -0,0 +1,44 @@
+"""
+A Kanban board of tasks: a column per status holding its most recently changed
+tasks, read in a single query that numbers and counts the tasks of every status
+with window functions.
+"""
+from django.db.models import Count, F, QuerySet, Window
+from django.db.models.functions import RowNumber
+
+from umsebenzi.enums import TaskStatus
+
+BOARD_VALUES = (
+    'id', 'code', 'title', 'status', 'issue', 'parent_id', 'due_date', 'modified_at',
+    'assigned_to_id', 'assigned_to__username',
+)
+
+
+def get_board(queryset: QuerySet, limit: int) -> list:
+    """
+    The first `limit` tasks of each status in queryset, most recently changed first,
+    with the number of tasks in each status. Statuses without tasks get an empty column.
+    """
+    by_status = {'partition_by': F('status')}
+    rows = queryset.annotate(
+        position=Window(RowNumber(), order_by=[F('modified_at').desc(), F('id').desc()], **by_status),
+        column_total=Window(Count('id'), **by_status),
+    ).filter(position__lte=limit).order_by('status', 'position').values(*BOARD_VALUES, 'column_total')
+
+    columns = {status: {'status': status, 'total': 0, 'tasks': []} for status in TaskStatus}
+    for row in rows:
+        column = columns[row['status']]
+        column['total'] = row['column_total']
+        column['tasks'].append({
+            'id': row['id'],
+            'code': row['code'],
+            'title': row['title'],
+            'status': row['status'],
+            'issue': row['issue'],
+            'parent': row['parent_id'],
+            'due_date': row['due_date'],
+            'modified_at': row['modified_at'],
+            'assigned_to': {'id': row['assigned_to_id'], 'username': row['assigned_to__username']},
+        })
+    # Archived tasks are not on the board
+    return [column for status, column in columns.items() if status is not TaskStatus.ARCHIVE]
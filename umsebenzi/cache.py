@@ -0,0 +1,129 @@
+"""
+Per user cache of rendered task and project lists.
+
+Entries are keyed on a per user generation number. Model signals bump the
+generation of every user whose lists a change shows up in, once the change is
+committed, so their old entries are never read again and expire on their own.
+"""
+import time
+from hashlib import md5
+from typing import Optional
+
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+
+from umsebenzi.conf import get_setting
+from umsebenzi.models import Project, Task
+
+
+class ListCache:
+
+    @property
+    def enabled(self) -> bool:
+        return get_setting('LIST_CACHE')
+
+    @property
+    def cache(self):
+        return caches[get_setting('CACHE_ALIAS')]
+
+    @staticmethod
+    def generation_key(user_pk) -> str:
+        return f'umsebenzi:list-generation:{user_pk}'
+
+    def generation(self, user_pk) -> int:
+        key = self.generation_key(user_pk)
+        generation = self.cache.get(key)
+        if generation is None:
+            # Start from the clock so an evicted generation never comes back to an old value
+            self.cache.add(key, time.time_ns(), timeout=None)
+            generation = self.cache.get(key)
+        return generation
+
+    def key(self, request, kind: str) -> Optional[str]:
+        """
+        The cache key of a list request, None when the cache is disabled.
+        Read it before building the response so a change made meanwhile is not cached as current.
+        """
+        if not self.enabled or not request.user.is_authenticated:
+            return None
+        generation = self.generation(request.user.pk)
+        url = f'{request.accepted_renderer.format}:{request.build_absolute_uri()}'
+        digest = md5(url.encode(), usedforsecurity=False).hexdigest()
+        return f'umsebenzi:list:{kind}:{request.user.pk}:{generation}:{digest}'
+
+    def get(self, key: Optional[str]) -> Optional[HttpResponse]:
+        if key is None:
+            return None
+        entry = self.cache.get(key)
+        self.count('hits' if entry else 'misses')
+        if entry is None:
+            return None
+        content, content_type = entry
+        return HttpResponse(content, content_type=content_type)
+
+    def set(self, key: Optional[str], response):
+        """Store the response once it is rendered"""
+        if key is None or response.status_code != 200:
+            return response
+
+        def store(rendered):
+            if len(rendered.content) <= get_setting('LIST_CACHE_MAX_SIZE'):
+                self.cache.set(key, (rendered.content, rendered['Content-Type']), get_setting('LIST_CACHE_TTL'))
+
+        response.add_post_render_callback(store)
+        return response
+
+    def invalidate(self, *user_pks):
+        """
+        Drop every cached list of the users once the change is committed. Bumped earlier, a list
+        read before the commit would be cached under the new generation with the old rows.
+        """
+        if not self.enabled:
+            return
+        user_pks = set(filter(None, user_pks))
+        transaction.on_commit(lambda: self.bump(user_pks))
+
+    def bump(self, user_pks):
+        for user_pk in user_pks:
+            try:
+                self.cache.incr(self.generation_key(user_pk))
+            except ValueError:
+                self.cache.add(self.generation_key(user_pk), time.time_ns(), timeout=None)
+
+    @staticmethod
+    def counter_key(name: str) -> str:
+        return f'umsebenzi:list-cache:{name}'
+
+    def count(self, name: str):
+        # Kept in the cache so every process adds to the same counters
+        try:
+            self.cache.incr(self.counter_key(name))
+        except ValueError:
+            self.cache.add(self.counter_key(name), 1, timeout=None)
+
+    def stats(self) -> dict:
+        """Hits and misses of every process sharing the cache"""
+        counters = self.cache.get_many([self.counter_key('hits'), self.counter_key('misses')])
+        return {name: counters.get(self.counter_key(name), 0) for name in ('hits', 'misses')}
+
+
+def task_list_users(task: Task) -> set:
+    """
+    Users whose lists show the task: its creator and assignee before and after the change,
+    the users of its epic, which lists it as a subtask, and the owner of its project, whose task counts move
+    """
+    users = {task.created_by_id, task.assigned_to_id, *getattr(task, 'initial_users', ())}
+    if task.parent_id:
+        if Task.parent.is_cached(task):
+            users.update((task.parent.created_by_id, task.parent.assigned_to_id))
+        else:
+            users.update(*Task.objects.filter(pk=task.parent_id).values_list('created_by', 'assigned_to'))
+    if Task.project.is_cached(task):
+        users.add(task.project.created_by_id)
+    else:
+        users.update(Project.objects.filter(pk=task.project_id).values_list('created_by', flat=True))
+    return users
+
+
+list_cache = ListCache()
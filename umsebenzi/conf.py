@@ -0,0 +1,34 @@
+from django.conf import settings
+
+DEFAULTS = {
+    # Cache alias used for anything umsebenzi caches
+    'CACHE_ALIAS': 'default',
+    # Seconds project statistics are cached for, 0 computes them on every request
+    'STATS_CACHE_TTL': 0,
+    # Cache rendered task and project lists per user, invalidated when their rows change
+    'LIST_CACHE': False,
+    # Seconds a cached list is kept for
+    'LIST_CACHE_TTL': 300,
+    # Largest rendered list in bytes that is cached
+    'LIST_CACHE_MAX_SIZE': 1024 * 1024,
+    # How the tasks a user created or is assigned to are found: 'or' filters on
+    # created_by OR assigned_to, 'union' selects the ids of both through a UNION
+    'VISIBILITY_STRATEGY': 'or',
+    # The statuses a task may move to from each status, by name, None allows any change.
+    # umsebenzi.transitions.WORKFLOW is an example
+    'STATUS_TRANSITIONS': None,
+    # Render task lists from values() rows instead of TaskSerializer, the output is the same
+    'FAST_TASK_LIST': True,
+    # Measure queries and timings of every request and send them as a Server-Timing header
+    'METRICS': False,
+    # Callable, or its dotted path, called with the metrics dict of every measured request
+    'METRICS_HOOK': None,
+    # Seconds the sync cursor is held back for, covering transactions that were still
+    # uncommitted when a sync read past their rows. Raise it above the longest write
+    'SYNC_SETTLE_SECONDS': 60,
+}
+
+
+def get_setting(name: str):
+    """Read UMSEBENZI_<name> from the django settings, falling back to its default"""
+    return getattr(settings, f'UMSEBENZI_{name}', DEFAULTS[name])
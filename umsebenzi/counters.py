@@ -0,0 +1,97 @@
+"""
+Denormalized task counters: the number of a projects tasks in each status
+and the number of subtasks, and completed subtasks, of each epic.
+
+Callers describe the tasks they add and remove as (project_id, parent_id, status)
+states and the counters are moved with UPDATE statements in the same transaction.
+"""
+from collections import Counter, defaultdict
+from functools import reduce
+from operator import or_
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from umsebenzi.enums import TaskStatus
+from umsebenzi.models import ProjectTaskCounter, Task
+
+
+def task_state(task: Task) -> tuple:
+    """The fields of a task its counters depend on"""
+    return task.project_id, task.parent_id, int(task.status)
+
+
+def lock_task(task: Task) -> Task:
+    """
+    Lock the row of a saved task until the transaction ends and read its counter state and users.
+    The state of a task loaded earlier may be outdated by a concurrent change and counted twice.
+    """
+    return Task.objects.select_for_update().only(
+        'project', 'parent', 'status', 'created_by', 'assigned_to'
+    ).get(pk=task.pk)
+
+
+def update_counters(added: Iterable[tuple] = (), removed: Iterable[tuple] = ()):
+    """Move the counters for tasks added and removed, given as task states"""
+    projects = Counter()
+    totals = Counter()
+    done = Counter()
+    for sign, states in ((1, added), (-1, removed)):
+        for project_id, parent_id, status in states:
+            projects[project_id, status] += sign
+            if parent_id:
+                totals[parent_id] += sign
+                if status == TaskStatus.COMPLETE:
+                    done[parent_id] += sign
+
+    projects = {key: delta for key, delta in projects.items() if delta}
+    epics = defaultdict(list)
+    for parent_id in totals.keys() | done.keys():
+        if totals[parent_id] or done[parent_id]:
+            epics[totals[parent_id], done[parent_id]].append(parent_id)
+
+    if not projects and not epics:
+        return
+
+    with transaction.atomic(savepoint=False):
+        if projects:
+            _update_projects(projects)
+        for (total, completed), pks in epics.items():
+            Task.objects.filter(pk__in=pks).update(
+                subtask_count=F('subtask_count') + total,
+                subtask_done_count=F('subtask_done_count') + completed
+            )
+
+
+def _update_projects(projects: dict):
+    # Only counters that grow can be missing, a counter row is never created to go negative
+    ProjectTaskCounter.objects.bulk_create(
+        [ProjectTaskCounter(project_id=project_id, status=status)
+         for (project_id, status), delta in projects.items() if delta > 0],
+        ignore_conflicts=True
+    )
+    matches = [Q(project_id=project_id, status=status) for project_id, status in projects]
+    ProjectTaskCounter.objects.filter(reduce(or_, matches)).update(count=F('count') + Case(
+        *[When(match, then=Value(delta)) for match, delta in zip(matches, projects.values())],
+        default=Value(0)
+    ))
+
+
+def rebuild_counters():
+    """Recount every counter from the tasks table"""
+    with transaction.atomic():
+        ProjectTaskCounter.objects.all().delete()
+        ProjectTaskCounter.objects.bulk_create(
+            ProjectTaskCounter(project_id=row['project'], status=row['status'], count=row['count'])
+            for row in Task.objects.order_by().values('project', 'status').annotate(count=Count('id'))
+        )
+
+        subtasks = Task.objects.filter(parent=OuterRef('pk')).order_by().values('parent')
+        total = subtasks.annotate(count=Count('id')).values('count')
+        completed = subtasks.filter(status=TaskStatus.COMPLETE).annotate(count=Count('id')).values('count')
+        Task.objects.update(
+            subtask_count=Coalesce(Subquery(total), Value(0)),
+            subtask_done_count=Coalesce(Subquery(completed), Value(0))
+        )
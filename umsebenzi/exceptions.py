@@ -1,2 +1,6 @@
 class TaskCodeException(Exception):
-    pass
\ No newline at end of file
+    pass
+
+
+class AppendOnlyException(Exception):
+    pass
@@ -0,0 +1,79 @@
+"""
+Encoders for the task export, which streams rows straight from a
+values() query without building model instances or serializers.
+"""
+import csv
+from datetime import date
+from typing import Iterable, Iterator
+
+from django.db.models import QuerySet
+from rest_framework.utils.encoders import JSONEncoder
+
+# Column name: the lookup it is read from
+EXPORT_FIELDS = {
+    'id': 'id',
+    'code': 'code',
+    'project': 'project__code',
+    'title': 'title',
+    'description': 'description',
+    'status': 'status',
+    'issue': 'issue',
+    'parent': 'parent__code',
+    'created_by': 'created_by__username',
+    'assigned_to': 'assigned_to__username',
+    'due_date': 'due_date',
+    'created_at': 'created_at',
+    'modified_at': 'modified_at',
+}
+
+
+def export_rows(queryset: QuerySet, chunk_size: int) -> Iterator[dict]:
+    """The export columns of every task, fetched chunk_size rows at a time"""
+    rows = queryset.order_by('id').values_list(*EXPORT_FIELDS.values())
+    for values in rows.iterator(chunk_size=chunk_size):
+        row = dict(zip(EXPORT_FIELDS, values))
+        row['status'] = row['status'].name
+        row['issue'] = row['issue'].name
+        yield row
+
+
+def encode_ndjson(rows: Iterable[dict]) -> Iterator[str]:
+    encoder = JSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+def encode_json(rows: Iterable[dict]) -> Iterator[str]:
+    """A JSON array, written one row at a time"""
+    encoder = JSONEncoder(ensure_ascii=False)
+    separator = '['
+    for row in rows:
+        yield separator + encoder.encode(row)
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
+
+class _Line:
+    """Hands back what csv.writer writes instead of buffering it"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def encode_csv(rows: Iterable[dict]) -> Iterator[str]:
+    """A header line and a line per row, dates formatted as in the JSON formats"""
+    encoder = JSONEncoder()
+    writer = csv.writer(_Line())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(
+            encoder.default(value) if isinstance(value, date) else value
+            for value in row.values()
+        )
+
+
+ENCODERS = {
+    'ndjson': encode_ndjson,
+    'json': encode_json,
+    'csv': encode_csv,
+}
@@ -1,11 +1,32 @@
 from django_filters import rest_framework as filters
 
 from umsebenzi.models import Task
+from umsebenzi.search import search_tasks
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    pass
 
 
 class TaskFilter(filters.FilterSet):
+    """
+    Every filter is answered from an index: status, issue and assignee from the partial
+    (user, issue, status) indexes, due dates from the (user, issue, due_date) ones,
+    parent, project and modified_at from their own.
+    """
     project = filters.CharFilter(field_name='project__code', lookup_expr='exact')
+    status__in = NumberInFilter(field_name='status', lookup_expr='in')
+    # Ids, a model choice filter would look the user or task up first
+    assigned_to = filters.NumberFilter(field_name='assigned_to')
+    parent = filters.NumberFilter(field_name='parent')
+    due_date__gte = filters.DateFilter(field_name='due_date', lookup_expr='gte')
+    due_date__lte = filters.DateFilter(field_name='due_date', lookup_expr='lte')
+    modified_at__gte = filters.IsoDateTimeFilter(field_name='modified_at', lookup_expr='gte')
+    q = filters.CharFilter(method='search', label='Search titles and descriptions')
 
     class Meta:
         model = Task
-        fields = ['project', 'status']
+        fields = ['project', 'status', 'issue']
+
+    def search(self, queryset, name, value):
+        return search_tasks(queryset, value)
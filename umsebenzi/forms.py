@@ -1,7 +1,11 @@
 from django import forms
+from django.db import transaction
 from umsebenzi.models import Task, Project
 from umsebenzi.latest import get_task_code
 from umsebenzi.enums import Issue
+from umsebenzi.counters import lock_task, task_state, update_counters
+from umsebenzi.transitions import record_transitions
+from umsebenzi.signals import record_lost_users
 
 
 class TaskForm(forms.ModelForm):
@@ -39,5 +43,16 @@ class TaskForm(forms.ModelForm):
             project = self.cleaned_data['project']
             count = get_task_code(project)
             task.code = f'{project.code}-{count}'
-        task.save()
+        with transaction.atomic():
+            before = None
+            if task.pk:
+                # Counters state of the row before the form changes it
+                current = lock_task(task)
+                before = task_state(current)
+                task.initial_users = current.initial_users
+            task.save()
+            if before:
+                record_lost_users(task)
+            update_counters(added=[task_state(task)], removed=[before] if before else [])
+            record_transitions([(task.pk, task.project_id, before[2] if before else None, task.status)])
         return task
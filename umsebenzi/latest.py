@@ -1,14 +1,36 @@
+from django.db import transaction
+from django.db.models import F
+
 from umsebenzi.models import Task, Project
 from umsebenzi.exceptions import TaskCodeException
 
 
-def get_task_code(project : Project) -> int:
-    """Get latest projects task code and increment by 1"""
+def get_latest_task_number(project: Project) -> int:
+    """Get the number of the projects latest task code, 0 if it has no tasks"""
     try:
         task = Task.objects.filter(project=project).latest('id')
-        code = int(task.code.split('-')[-1])
-        return code + 1
+        return int(task.code.split('-')[-1])
     except (IndexError, ValueError):
         raise TaskCodeException
     except Task.DoesNotExist:
-        return 1
+        return 0
+
+
+def get_task_code(project: Project, count: int = 1) -> int:
+    """
+    Reserve the projects next `count` task code numbers and return the first.
+
+    The counter is incremented before it is read, so concurrent callers wait
+    on the projects row lock instead of computing the same code.
+    Projects without a counter yet continue from their latest task code.
+    """
+    projects = Project.objects.filter(pk=project.pk)
+    with transaction.atomic():
+        projects.update(next_task_number=F('next_task_number') + count)
+        number = projects.values_list('next_task_number', flat=True).get()
+        if number is None:
+            number = get_latest_task_number(project) + 1
+            projects.update(next_task_number=number + count)
+        else:
+            number -= count
+    return number
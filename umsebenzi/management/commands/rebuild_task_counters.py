@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from umsebenzi.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Recount the per project task status counters and per epic subtask counters'
+
+    def handle(self, *args, **options):
+        rebuild_counters()
+        self.stdout.write(self.style.SUCCESS('Task counters rebuilt'))
@@ -0,0 +1,103 @@
+"""
+Per request measurements of the umsebenzi views, collected by MetricsMixin
+when UMSEBENZI_METRICS is on and passed to the UMSEBENZI_METRICS_HOOK callable.
+"""
+import logging
+from functools import wraps
+from time import perf_counter
+from typing import Callable, Optional
+
+from django.utils.module_loading import import_string
+
+from umsebenzi.conf import get_setting
+
+logger = logging.getLogger(__name__)
+
+
+class RequestMetrics:
+    """
+    Query count and SQL, serialization and render time of one request.
+    Install it with connection.execute_wrapper to count the queries.
+    """
+
+    def __init__(self, method: str, view: Optional[str] = None):
+        self.method = method
+        self.view = view
+        self.start = perf_counter()
+        self.queries = 0
+        self.sql = 0.0
+        self.serialize = 0.0
+        self.render = 0.0
+        self.total = 0.0
+        # 'hit' or 'miss' when the list cache was looked up
+        self.list_cache = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += perf_counter() - start
+            self.queries += 1
+
+    def time_serializer(self, to_representation: Callable) -> Callable:
+        """Add the time spent in to_representation, less its queries, to the serialize time"""
+        @wraps(to_representation)
+        def timed(instance):
+            start, sql = perf_counter(), self.sql
+            try:
+                return to_representation(instance)
+            finally:
+                self.serialize += perf_counter() - start - (self.sql - sql)
+        return timed
+
+    def finish(self, response):
+        """Complete the measurements, add them to the response and pass them to the hook"""
+        self.total = perf_counter() - self.start
+        response['Server-Timing'] = self.server_timing()
+        hook = get_metrics_hook()
+        if hook is not None:
+            try:
+                hook(self.as_dict(response))
+            except Exception:
+                # A failing metrics backend must not fail the request
+                logger.exception('Metrics hook failed for %s', self.view)
+
+    def server_timing(self) -> str:
+        return ', '.join([
+            f'db;dur={self.sql * 1000:.2f};desc="{self.queries} queries"',
+            f'serialize;dur={self.serialize * 1000:.2f}',
+            f'render;dur={self.render * 1000:.2f}',
+            f'total;dur={self.total * 1000:.2f}',
+        ])
+
+    def as_dict(self, response) -> dict:
+        return {
+            'view': self.view,
+            'method': self.method,
+            'status': response.status_code,
+            'queries': self.queries,
+            'sql_ms': self.sql * 1000,
+            'serialize_ms': self.serialize * 1000,
+            'render_ms': self.render * 1000,
+            'total_ms': self.total * 1000,
+            'response_bytes': None if response.streaming else len(response.content),
+            'list_cache': self.list_cache,
+        }
+
+
+def get_metrics_hook() -> Optional[Callable]:
+    """The UMSEBENZI_METRICS_HOOK callable, which may be given as a dotted path"""
+    hook = get_setting('METRICS_HOOK')
+    if isinstance(hook, str):
+        hook = import_string(hook)
+    return hook
+
+
+def log_metrics(metrics: dict):
+    """A metrics hook that logs every request to the umsebenzi.metrics logger"""
+    logger.info(
+        '%(method)s %(view)s %(status)s: %(queries)d queries in %(sql_ms).2fms, '
+        'serialize %(serialize_ms).2fms, render %(render_ms).2fms, total %(total_ms).2fms, '
+        '%(response_bytes)s bytes', metrics
+    )
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.17 on 2026-10-18 11:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('umsebenzi', '0003_alter_task_due_date_alter_task_parent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['created_at', 'id'], name='umsebenzi_p_created_6354a4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['created_at', 'id'], name='umsebenzi_t_created_c3bdbf_idx'),
+        ),
+    ]
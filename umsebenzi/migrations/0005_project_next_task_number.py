@@ -0,0 +1,18 @@
+# Generated by Django 4.2.17 on 2026-10-18 11:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('umsebenzi', '0004_created_at_id_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='next_task_number',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+    ]
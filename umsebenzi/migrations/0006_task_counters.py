@@ -0,0 +1,61 @@
+# Generated by Django 4.2.17 on 2026-10-18 11:59
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+import django_enumfield.db.fields
+import umsebenzi.enums
+
+COMPLETE = 6
+
+
+def count_tasks(apps, schema_editor):
+    Task = apps.get_model('umsebenzi', 'Task')
+    ProjectTaskCounter = apps.get_model('umsebenzi', 'ProjectTaskCounter')
+
+    ProjectTaskCounter.objects.bulk_create(
+        ProjectTaskCounter(project_id=row['project'], status=row['status'], count=row['count'])
+        for row in Task.objects.order_by().values('project', 'status').annotate(count=Count('id'))
+    )
+    subtasks = Task.objects.filter(parent=OuterRef('pk')).order_by().values('parent')
+    Task.objects.update(
+        subtask_count=Coalesce(Subquery(subtasks.annotate(count=Count('id')).values('count')), Value(0)),
+        subtask_done_count=Coalesce(
+            Subquery(subtasks.filter(status=COMPLETE).annotate(count=Count('id')).values('count')), Value(0)
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('umsebenzi', '0005_project_next_task_number'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='subtask_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='subtask_done_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='ProjectTaskCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', django_enumfield.db.fields.EnumField(enum=umsebenzi.enums.TaskStatus)),
+                ('count', models.IntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_counters', to='umsebenzi.project')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='projecttaskcounter',
+            constraint=models.UniqueConstraint(fields=('project', 'status'), name='unique_project_task_status'),
+        ),
+        migrations.RunPython(count_tasks, migrations.RunPython.noop),
+    ]
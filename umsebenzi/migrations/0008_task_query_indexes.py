@@ -0,0 +1,30 @@
+# Generated by Django 4.2.17 on 2026-10-18 12:06
+
+from django.db import migrations, models
+import umsebenzi.enums
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('umsebenzi', '0007_task_changes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='task',
+            name='umsebenzi_t_code_dfb0b8_idx',
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', umsebenzi.enums.TaskStatus(7)), _negated=True), fields=['assigned_to', 'issue', 'status'], name='task_assignee_issue_status'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', umsebenzi.enums.TaskStatus(7)), _negated=True), fields=['created_by', 'issue', 'status'], name='task_creator_issue_status'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'id'], name='umsebenzi_t_project_c88a20_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.17 on 2026-10-18 12:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django_enumfield.db.fields
+import umsebenzi.enums
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('umsebenzi', '0008_task_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskStatusTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', django_enumfield.db.fields.EnumField(enum=umsebenzi.enums.TaskStatus)),
+                ('to_status', django_enumfield.db.fields.EnumField(enum=umsebenzi.enums.TaskStatus)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+                ('changed_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('task', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='transitions', to='umsebenzi.task')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['task', 'changed_at'], name='umsebenzi_t_task_id_7a85a7_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.17 on 2026-10-18 12:20
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+import django_enumfield.db.fields
+import umsebenzi.enums
+
+DRAFT = 1
+
+
+def fill_projects(apps, schema_editor):
+    Task = apps.get_model('umsebenzi', 'Task')
+    TaskStatusTransition = apps.get_model('umsebenzi', 'TaskStatusTransition')
+    TaskStatusTransition.objects.update(
+        project_id=Subquery(Task.objects.filter(pk=OuterRef('task_id')).values('project_id')[:1])
+    )
+
+
+def log_creations(apps, schema_editor):
+    """Log the creation of the existing tasks, which were created in the default status"""
+    Task = apps.get_model('umsebenzi', 'Task')
+    TaskStatusTransition = apps.get_model('umsebenzi', 'TaskStatusTransition')
+    quote = schema_editor.quote_name
+    # A single INSERT ... SELECT, the model would set changed_at to now
+    schema_editor.execute(
+        f'INSERT INTO {quote(TaskStatusTransition._meta.db_table)} '
+        f'({quote("task_id")}, {quote("project_id")}, {quote("to_status")}, {quote("changed_at")}) '
+        f'SELECT {quote("id")}, {quote("project_id")}, %s, {quote("created_at")} FROM {quote(Task._meta.db_table)}',
+        [DRAFT]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('umsebenzi', '0009_task_status_transitions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskstatustransition',
+            name='project',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='umsebenzi.project'),
+        ),
+        migrations.AlterField(
+            model_name='taskstatustransition',
+            name='from_status',
+            field=django_enumfield.db.fields.EnumField(enum=umsebenzi.enums.TaskStatus, null=True),
+        ),
+        migrations.AlterField(
+            model_name='taskstatustransition',
+            name='task',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='transitions', to='umsebenzi.task'),
+        ),
+        migrations.RunPython(fill_projects, migrations.RunPython.noop),
+        migrations.RunPython(log_creations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.17 on 2026-10-18 12:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    # Separate from 0010, postgres cannot alter a table with pending trigger events from its backfill
+
+    dependencies = [
+        ('umsebenzi', '0010_transition_log'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='taskstatustransition',
+            name='project',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='umsebenzi.project'),
+        ),
+        migrations.AddIndex(
+            model_name='taskstatustransition',
+            index=models.Index(fields=['project', 'to_status', 'changed_at', 'task'], name='transition_project_status'),
+        ),
+    ]
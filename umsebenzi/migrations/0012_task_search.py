@@ -0,0 +1,62 @@
+from django.db import migrations
+
+# The schema as of this migration, later changes to umsebenzi.search get their own migration
+POSTGRES_CONFIG = 'english'
+VECTOR_COLUMN = 'search_vector'
+FTS_TABLE = 'umsebenzi_task_fts'
+
+FTS_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description, content='umsebenzi_task', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON umsebenzi_task BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON umsebenzi_task BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF title, description ON umsebenzi_task BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        # A stored generated column is kept up to date by postgres on every write, bulk ones included
+        schema_editor.execute(
+            f'ALTER TABLE umsebenzi_task ADD COLUMN {VECTOR_COLUMN} tsvector GENERATED ALWAYS AS ('
+            f"setweight(to_tsvector('{POSTGRES_CONFIG}', coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('{POSTGRES_CONFIG}', coalesce(description, '')), 'B')"
+            f') STORED'
+        )
+        schema_editor.execute(f'CREATE INDEX task_search ON umsebenzi_task USING gin ({VECTOR_COLUMN})')
+    elif connection.vendor == 'sqlite':
+        for sql in FTS_SQL:
+            schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute(f'ALTER TABLE umsebenzi_task DROP COLUMN {VECTOR_COLUMN}')
+    elif connection.vendor == 'sqlite':
+        for trigger in ('insert', 'delete', 'update'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{trigger}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('umsebenzi', '0011_transition_log_project'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
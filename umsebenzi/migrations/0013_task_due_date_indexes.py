@@ -0,0 +1,22 @@
+# Generated by Django 4.2.17 on 2026-10-18 12:34
+
+from django.db import migrations, models
+import umsebenzi.enums
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('umsebenzi', '0012_task_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', umsebenzi.enums.TaskStatus(7)), _negated=True), fields=['assigned_to', 'issue', 'due_date'], name='task_assignee_issue_due'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', umsebenzi.enums.TaskStatus(7)), _negated=True), fields=['created_by', 'issue', 'due_date'], name='task_creator_issue_due'),
+        ),
+    ]
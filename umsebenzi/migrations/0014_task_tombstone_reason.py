@@ -0,0 +1,18 @@
+# Generated by Django 4.2.17 on 2026-10-18 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('umsebenzi', '0013_task_due_date_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tasktombstone',
+            name='reason',
+            field=models.CharField(choices=[('deleted', 'Deleted'), ('reassigned', 'Reassigned')], default='deleted', max_length=16),
+        ),
+    ]
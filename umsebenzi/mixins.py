@@ -0,0 +1,158 @@
+from functools import lru_cache
+from hashlib import md5
+from time import perf_counter
+
+from django.db import connection
+from django.db.models import QuerySet
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.exceptions import ValidationError
+
+from umsebenzi.cache import list_cache
+from umsebenzi.conf import get_setting
+from umsebenzi.metrics import RequestMetrics
+
+
+class ConditionalGetMixin:
+    """
+    ETag support for list and retrieve, and Last-Modified for retrieve.
+
+    Views describe the rows a response renders through get_validators, which should
+    be a cheap aggregate query. Unchanged resources are answered with a 304 before
+    the queryset is evaluated or anything is serialized. Lists have no Last-Modified,
+    the latest modification of the rows left does not move when a row is deleted.
+    """
+
+    def get_validators(self, queryset: QuerySet) -> tuple:
+        """Return the (etag parts, last modified datetime) of the rows in queryset"""
+        raise NotImplementedError
+
+    def check_not_modified(self, request, queryset: QuerySet, dated=True):
+        """Return a 304 response if the clients copy is current, otherwise None"""
+        parts, last_modified = self.get_validators(queryset)
+        key = repr((request.user.pk, request.accepted_renderer.format, request.get_full_path(), *parts))
+        etag = quote_etag(md5(key.encode(), usedforsecurity=False).hexdigest())
+        timestamp = int(last_modified.timestamp()) if last_modified and dated else None
+        self.validators = etag, timestamp
+        return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+    def list(self, request, *args, **kwargs):
+        not_modified = self.check_not_modified(request, self.filter_queryset(self.get_queryset()), dated=False)
+        if not_modified is not None:
+            return not_modified
+        return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: kwargs[lookup_url_kwarg]}
+        )
+        not_modified = self.check_not_modified(request, queryset)
+        if not_modified is not None:
+            return not_modified
+        return super().retrieve(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        validators = getattr(self, 'validators', None)
+        if validators and response.status_code == 200:
+            etag, timestamp = validators
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+        return response
+
+
+class CachedListMixin:
+    """Serve list responses from the per user list cache when UMSEBENZI_LIST_CACHE is on"""
+
+    def list(self, request, *args, **kwargs):
+        key = list_cache.key(request, self.basename)
+        cached = list_cache.get(key)
+        if key is not None and getattr(self, 'metrics', None) is not None:
+            self.metrics.list_cache = 'miss' if cached is None else 'hit'
+        if cached is not None:
+            return cached
+        response = super().list(request, *args, **kwargs)
+        return list_cache.set(key, response)
+
+
+@lru_cache(maxsize=None)
+def readable_fields(serializer_class) -> frozenset:
+    return frozenset(name for name, field in serializer_class().fields.items() if not field.write_only)
+
+
+class SparseFieldsMixin:
+    """
+    ?fields= limits list and detail responses to the fields named, ?expand= nests only
+    the relations named and renders the other relations as their id. The view passes
+    get_sparse_fields to its loading plan so the queryset narrows along with the response.
+    """
+    sparse_actions = ('list', 'retrieve')
+
+    def get_sparse_fields(self) -> tuple:
+        """The (fields, expand) names the request asked for, None for a parameter it did not send"""
+        if not hasattr(self, '_sparse_fields'):
+            if (
+                self.request is None or self.request.method != 'GET' or self.action not in self.sparse_actions
+                or getattr(self, 'swagger_fake_view', False)
+            ):
+                self._sparse_fields = None, None
+            else:
+                self._sparse_fields = (
+                    self.parse_field_names('fields', readable_fields(self.serializer_class)),
+                    self.parse_field_names('expand', self.serializer_class.expandable_fields),
+                )
+        return self._sparse_fields
+
+    def parse_field_names(self, param: str, allowed):
+        value = self.request.query_params.get(param)
+        if value is None:
+            return None
+        names = frozenset(name.strip() for name in value.split(',') if name.strip())
+        unknown = names.difference(allowed)
+        if unknown:
+            raise ValidationError({param: [f'Unknown fields: {", ".join(sorted(unknown))}']})
+        return names
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'], context['expand'] = self.get_sparse_fields()
+        return context
+
+
+class MetricsMixin:
+    """
+    Measure each request when UMSEBENZI_METRICS is on: its query count and SQL time,
+    the time spent serializing and rendering, and the response size. They are sent
+    as a Server-Timing header and passed to UMSEBENZI_METRICS_HOOK.
+    """
+    metrics = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if not get_setting('METRICS'):
+            return super().dispatch(request, *args, **kwargs)
+
+        self.metrics = RequestMetrics(request.method)
+        with connection.execute_wrapper(self.metrics):
+            response = super().dispatch(request, *args, **kwargs)
+        # The action is only known once the request is initialized
+        self.metrics.view = f'{self.basename}-{getattr(self, "action", None)}'
+        if getattr(response, 'is_rendered', True):
+            # Cached and not modified responses are complete already
+            self.metrics.finish(response)
+        else:
+            rendering = perf_counter()
+
+            def rendered(response):
+                self.metrics.render = perf_counter() - rendering
+                self.metrics.finish(response)
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.metrics is not None:
+            serializer.to_representation = self.metrics.time_serializer(serializer.to_representation)
+        return serializer
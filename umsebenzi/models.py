@@ -3,26 +3,50 @@ from django.conf import settings
 
 from django_enumfield import enum
 from umsebenzi.enums import TaskStatus, Issue
+from umsebenzi.exceptions import AppendOnlyException
 
 
-class Project(models.Model):
+class CounterModel(models.Model):
+    """
+    Model with counter columns that are only moved by UPDATE statements.
+    Saving an existing row leaves them out so a stale instance cannot write an old count back.
+    """
+    counter_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            skip = self.get_deferred_fields() | set(self.counter_fields)
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields if not f.primary_key and f.attname not in skip
+            ]
+        super().save(*args, **kwargs)
+
+
+class Project(CounterModel):
     title = models.CharField(max_length=255)
     description = models.TextField()
     code = models.CharField(max_length=10, unique=True)
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name='projects')
     created_at = models.DateTimeField(auto_now_add=True)
     modified_at = models.DateTimeField(auto_now=True)
+    next_task_number = models.PositiveIntegerField(null=True, editable=False)
+
+    counter_fields = ('next_task_number',)
 
     def __str__(self):
         return f'{self.code} - {self.title}'
 
     class Meta:
         indexes = [
-            models.Index(fields=['title', 'code'])
+            models.Index(fields=['title', 'code']),
+            models.Index(fields=['created_at', 'id'])
         ]
 
 
-class Task(models.Model):
+class Task(CounterModel):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='tasks')
     code = models.CharField(max_length=255, unique=True)
     title = models.CharField(max_length=255)
@@ -35,11 +59,121 @@ class Task(models.Model):
     due_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     modified_at = models.DateTimeField(auto_now=True)
+    subtask_count = models.IntegerField(default=0, editable=False)
+    subtask_done_count = models.IntegerField(default=0, editable=False)
+
+    counter_fields = ('subtask_count', 'subtask_done_count')
 
     def __str__(self):
         return f'{self.code} - {self.title}'
 
     class Meta:
         indexes = [
-            models.Index(fields=['code'])
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['modified_at', 'id']),
+            # The task list: a users epics or subtasks that are not archived, optionally in one status
+            models.Index(
+                fields=['assigned_to', 'issue', 'status'],
+                condition=~models.Q(status=TaskStatus.ARCHIVE),
+                name='task_assignee_issue_status'
+            ),
+            models.Index(
+                fields=['created_by', 'issue', 'status'],
+                condition=~models.Q(status=TaskStatus.ARCHIVE),
+                name='task_creator_issue_status'
+            ),
+            # Overdue and upcoming tasks of a user
+            models.Index(
+                fields=['assigned_to', 'issue', 'due_date'],
+                condition=~models.Q(status=TaskStatus.ARCHIVE),
+                name='task_assignee_issue_due'
+            ),
+            models.Index(
+                fields=['created_by', 'issue', 'due_date'],
+                condition=~models.Q(status=TaskStatus.ARCHIVE),
+                name='task_creator_issue_due'
+            ),
+            # Latest task of a project
+            models.Index(fields=['project', 'id'])
+        ]
+
+
+class ProjectTaskCounter(models.Model):
+    """Number of a projects tasks in each status, maintained by umsebenzi.counters"""
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='task_counters')
+    status = enum.EnumField(TaskStatus)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.project_id} - {self.status.name}: {self.count}'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'status'], name='unique_project_task_status')
         ]
+
+
+class TaskTombstone(models.Model):
+    """
+    A deleted task, or a task its users lost when it was reassigned,
+    kept so syncing clients can drop their copy
+    """
+    class Reason(models.TextChoices):
+        DELETED = 'deleted'
+        REASSIGNED = 'reassigned'
+
+    task_id = models.BigIntegerField()
+    code = models.CharField(max_length=255)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    assigned_to = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    reason = models.CharField(max_length=16, choices=Reason.choices, default=Reason.DELETED)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.code} - {self.deleted_at}'
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'])
+        ]
+
+
+class AppendOnlyQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        raise AppendOnlyException(f'{self.model.__name__} rows cannot be changed')
+
+    def delete(self):
+        raise AppendOnlyException(f'{self.model.__name__} rows cannot be deleted')
+
+
+class TaskStatusTransition(models.Model):
+    """
+    Append only log of task status events, kept for cycle time and throughput metrics.
+    A task's creation is logged without a from_status. Events outlive their task and
+    are only removed with their project.
+    """
+    task = models.ForeignKey(
+        Task, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='transitions'
+    )
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='+', db_index=False)
+    from_status = enum.EnumField(TaskStatus, null=True)
+    to_status = enum.EnumField(TaskStatus)
+    changed_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, on_delete=models.SET_NULL, related_name='+')
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    objects = AppendOnlyQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['task', 'changed_at']),
+            # Completions of a project in a period
+            models.Index(fields=['project', 'to_status', 'changed_at', 'task'], name='transition_project_status'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise AppendOnlyException('TaskStatusTransition rows cannot be changed')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise AppendOnlyException('TaskStatusTransition rows cannot be deleted')
@@ -0,0 +1,99 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from typing import Union
+
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_cursor(value: Union[datetime, float], pk: int) -> str:
+    """Encode a (timestamp or search rank, id) keyset position as an opaque cursor"""
+    position = json.dumps([value.isoformat() if isinstance(value, datetime) else value, pk])
+    return urlsafe_b64encode(position.encode('ascii')).decode('ascii')
+
+
+def decode_cursor(cursor: str, ranked: bool = False) -> tuple:
+    """Decode a cursor made by encode_cursor, raise ValueError if it is malformed"""
+    try:
+        value, pk = json.loads(urlsafe_b64decode(cursor.encode('ascii')))
+        if ranked:
+            value = value if isinstance(value, (int, float)) else None
+        else:
+            value = parse_datetime(value)
+    except (TypeError, ValueError, UnicodeEncodeError):
+        raise ValueError(cursor)
+    if value is None or not isinstance(pk, int):
+        raise ValueError(cursor)
+    return value, pk
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Newest first keyset pagination on (created_at, id).
+
+    Every page is a range scan on the (created_at, id) index from the previous
+    page's last row, so deep pages cost the same as the first one.
+    Pagination is opt in: it only applies when the client sends a cursor or
+    a page size, otherwise the full list is returned as before.
+    Search results are paged most relevant first, on (search_rank, id).
+    """
+    page_size = 100
+    max_page_size = 1000
+    page_size_query_param = 'page_size'
+
+    def is_requested(self, request) -> bool:
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def paginate_queryset(self, queryset: QuerySet, request, view=None):
+        if not self.is_requested(request):
+            return None
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        ranked = 'search_rank' in queryset.query.annotations
+        self.position_field = field = 'search_rank' if ranked else 'created_at'
+        queryset = queryset.order_by(f'-{field}', '-id')
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            try:
+                value, pk = decode_cursor(cursor, ranked)
+            except ValueError:
+                raise NotFound(self.invalid_cursor_message)
+            queryset = queryset.filter(
+                Q(**{f'{field}__lte': value}),
+                Q(**{f'{field}__lt': value}) | Q(id__lt=pk)
+            )
+
+        page = list(queryset[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        self.page = page[:self.page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        cursor = encode_cursor(getattr(last, self.position_field), last.id)
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_previous_link(self):
+        return None
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties'].pop('previous')
+        return response_schema
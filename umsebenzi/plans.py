@@ -0,0 +1,93 @@
+"""
+Eager loading plans for the querysets that the viewsets serialize.
+Related rows are joined in with select_related and trimmed with only()
+to the columns their nested serializers actually render.
+"""
+from django.db.models import Prefetch, QuerySet
+
+from umsebenzi.models import Project, Task
+from umsebenzi.serializers import UserSerializer, MinialProjectSerializer, SubTaskSerializer
+
+USER_COLUMNS = UserSerializer.Meta.fields
+PROJECT_COLUMNS = tuple(f for f in MinialProjectSerializer.Meta.fields if f != 'url')
+SUBTASK_COLUMNS = ('id', 'parent') + tuple(f for f in SubTaskSerializer.Meta.fields if f != 'url')
+RELATED_COLUMNS = {'project': PROJECT_COLUMNS, 'assigned_to': USER_COLUMNS, 'created_by': USER_COLUMNS}
+
+
+def _columns(model) -> list:
+    return [f.name for f in model._meta.concrete_fields]
+
+
+def _related(relation: str, columns) -> list:
+    return [f'{relation}__{column}' for column in columns]
+
+
+def task_plan(queryset: QuerySet, fields=None, expand=None) -> QuerySet:
+    """
+    Load a tasks project, users and subtasks alongside it. With the fields and expand
+    of a sparse request only their columns are read and only expanded relations joined.
+    """
+    def wanted(name):
+        return fields is None or name in fields
+
+    def expanded(name):
+        return wanted(name) and (expand is None or name in expand)
+
+    # Pagination positions on created_at and id, subtasks are only rendered for epics
+    needed = {'id', 'created_at', 'issue'} if wanted('subtasks') else {'id', 'created_at'}
+    relations = [name for name in ('project', 'assigned_to', 'created_by') if expanded(name)]
+    if relations:
+        # Without arguments select_related would follow every relation
+        queryset = queryset.select_related(*relations)
+    queryset = queryset.only(
+        *(column for column in _columns(Task) if wanted(column) or column in needed),
+        *(column for name in relations for column in _related(name, RELATED_COLUMNS[name])),
+    )
+    if wanted('subtasks'):
+        subtasks = SUBTASK_COLUMNS if expanded('subtasks') else ('id', 'parent')
+        queryset = queryset.prefetch_related(
+            Prefetch(
+                'task_set',
+                queryset=Task.objects.only(*subtasks).order_by('id'),
+                to_attr='prefetched_subtasks'
+            )
+        )
+    return queryset
+
+
+def project_plan(queryset: QuerySet, fields=None, expand=None) -> QuerySet:
+    """Load a projects creator and task counters alongside it, narrowed like task_plan"""
+    def wanted(name):
+        return fields is None or name in fields
+
+    created_by = wanted('created_by') and (expand is None or 'created_by' in expand)
+    queryset = queryset.only(
+        *(column for column in _columns(Project) if wanted(column) or column in ('id', 'created_at')),
+        *(_related('created_by', USER_COLUMNS) if created_by else []),
+    )
+    if created_by:
+        queryset = queryset.select_related('created_by')
+    if wanted('task_counts'):
+        queryset = queryset.prefetch_related('task_counters')
+    return queryset
+
+
+def tree_plan(queryset: QuerySet) -> QuerySet:
+    """Load a task with its project and users, and its subtasks with their users in one more query"""
+    users = ('assigned_to', 'created_by')
+    return queryset.select_related('project', *users).only(
+        *_columns(Task),
+        *_related('project', PROJECT_COLUMNS),
+        *_related('assigned_to', USER_COLUMNS),
+        *_related('created_by', USER_COLUMNS),
+    ).prefetch_related(
+        Prefetch(
+            'task_set',
+            queryset=Task.objects.select_related(*users).only(
+                *_columns(Task),
+                *_related('assigned_to', USER_COLUMNS),
+                *_related('created_by', USER_COLUMNS),
+            ).order_by('id'),
+            to_attr='tree_subtasks'
+        )
+    )
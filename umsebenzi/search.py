@@ -0,0 +1,138 @@
+"""
+Ranked full-text search over task titles and descriptions.
+
+On PostgreSQL tasks carry a generated search_vector tsvector column with a GIN
+index, on SQLite an external content FTS5 table kept in sync by triggers. Titles
+weigh more than descriptions. Other databases fall back to an unranked substring match.
+"""
+import re
+
+from django.db import OperationalError, connections
+from django.db.models import BooleanField, F, FloatField, Func, Q, QuerySet, Value
+
+# The text search configuration the search_vector column is built with
+POSTGRES_CONFIG = 'english'
+VECTOR_COLUMN = 'search_vector'
+FTS_TABLE = 'umsebenzi_task_fts'
+FTS_TRIGGERS = [f'{FTS_TABLE}_insert', f'{FTS_TABLE}_delete', f'{FTS_TABLE}_update']
+
+FTS_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description, content='umsebenzi_task', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON umsebenzi_task BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON umsebenzi_task BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF title, description ON umsebenzi_task BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+]
+
+
+def install_fts(connection, repair=False):
+    """
+    Create the SQLite search table and its triggers where they are missing and index the tasks.
+    SQLite drops the triggers whenever a migration rebuilds the task table, with repair
+    they are only put back, and the tasks indexed again, if the search table exists.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT name FROM sqlite_master WHERE name IN (%s, %s, %s, %s)', [FTS_TABLE, *FTS_TRIGGERS]
+        )
+        existing = {name for name, in cursor.fetchall()}
+        if len(existing) == 4 or (repair and FTS_TABLE not in existing):
+            return
+        for sql in FTS_SQL:
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def connect_fts(connection):
+    """
+    Load the search table on a new SQLite connection. Loaded for the first time by a
+    trigger, it reads the schema inside the writing transaction, which then fails with
+    'database is locked' instead of waiting when another connection is writing.
+    """
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT rowid FROM {FTS_TABLE} WHERE rowid = 0')
+    except OperationalError as e:
+        # Not migrated yet, such as while the test database is created
+        if 'no such table' not in str(e):
+            raise
+
+
+def uninstall_fts(connection):
+    with connection.cursor() as cursor:
+        for trigger in FTS_TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def fts_query(terms: str) -> str:
+    """The words of the search as an FTS5 query that matches tasks containing all of them"""
+    return ' '.join(f'"{word}"' for word in re.findall(r'\w+', terms))
+
+
+class TaskSearch(Func):
+    """SQL on the task id column and the search terms, written for each database"""
+    postgresql = sqlite = None
+
+    def __init__(self, terms: str):
+        super().__init__(F('pk'), Value(terms))
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        pk, terms = self.get_source_expressions()
+        terms_sql, params = compiler.compile(terms)
+        # The vector column of the same, possibly aliased, task table as the id
+        vector = f'{compiler.quote_name_unless_alias(pk.alias)}.{connection.ops.quote_name(VECTOR_COLUMN)}'
+        return self.postgresql % {'vector': vector, 'config': POSTGRES_CONFIG, 'terms': terms_sql}, params
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        pk, terms = self.get_source_expressions()
+        pk_sql, pk_params = compiler.compile(pk)
+        terms_sql, terms_params = compiler.compile(terms)
+        return self.sqlite % {'pk': pk_sql, 'terms': terms_sql}, (*pk_params, *terms_params)
+
+
+class SearchMatch(TaskSearch):
+    output_field = BooleanField()
+    postgresql = "%(vector)s @@ websearch_to_tsquery('%(config)s', %(terms)s)"
+    sqlite = f'%(pk)s IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %(terms)s)'
+
+
+class SearchRank(TaskSearch):
+    """Higher is more relevant"""
+    output_field = FloatField()
+    # As a double, a real would not round trip through the cursor of a page
+    postgresql = "ts_rank(%(vector)s, websearch_to_tsquery('%(config)s', %(terms)s))::double precision"
+    # bm25 is lower for better matches, the rowid lookup only ranks the task itself
+    sqlite = (
+        f'(SELECT -bm25({FTS_TABLE}, 2.0, 1.0) FROM {FTS_TABLE} '
+        f'WHERE rowid = %(pk)s AND {FTS_TABLE} MATCH %(terms)s)'
+    )
+
+
+def search_tasks(queryset: QuerySet, terms: str) -> QuerySet:
+    """
+    The tasks matching the search, annotated with their search_rank and
+    ordered by it, most relevant first.
+    """
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        terms = fts_query(terms)
+        if not terms:
+            return queryset.none()
+    elif vendor != 'postgresql':
+        return queryset.filter(
+            Q(title__icontains=terms) | Q(description__icontains=terms)
+        ).annotate(search_rank=Value(0.0)).order_by('-search_rank', '-id')
+    return queryset.filter(SearchMatch(terms)).annotate(
+        search_rank=SearchRank(terms)
+    ).order_by('-search_rank', '-id')
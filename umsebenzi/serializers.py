@@ -1,3 +1,9 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Value
+from django.db.models.functions import Concat, Substr
+from django.utils import timezone
 from rest_framework import serializers
 from drf_spectacular.utils import extend_schema_field
 from django.contrib.auth import get_user_model
@@ -6,10 +12,50 @@ from django_enumfield.contrib.drf import NamedEnumField
 from umsebenzi.models import Project, Task
 from umsebenzi.enums import TaskStatus, Issue
 from umsebenzi.latest import get_task_code
+from umsebenzi.counters import lock_task, task_state, update_counters
+from umsebenzi.cache import list_cache, task_list_users
+from umsebenzi.filters import TaskFilter
+from umsebenzi.signals import record_lost_users
+from umsebenzi.transitions import is_allowed, record_transitions, transition_error
 
 User = get_user_model()
 
 
+def request_user(context: dict):
+    """The user making the request the serializer handles, if any"""
+    request = context.get('request')
+    return request.user if request is not None and request.user.is_authenticated else None
+
+
+def validate_transition(instance: Task, attrs: dict):
+    """Reject status changes the configured workflow does not allow, without a query"""
+    if 'status' in attrs and not is_allowed(instance.status, attrs['status']):
+        raise serializers.ValidationError({'status': [transition_error(instance.status, attrs['status'])]})
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Render only the fields in the 'fields' context and nest only the expandable
+    relations in the 'expand' context, the others as their id. Either set to None,
+    as it is outside of SparseFieldsMixin views, leaves the fields as they are.
+    """
+    expandable_fields = ()
+
+    def get_fields(self):
+        fields = super().get_fields()
+        only, expand = self.context.get('fields'), self.context.get('expand')
+        if only is not None:
+            fields = {name: field for name, field in fields.items() if name in only or field.write_only}
+        if expand is not None:
+            for name in self.expandable_fields:
+                if name in fields and name not in expand:
+                    fields[name] = self.get_collapsed_field(name)
+        return fields
+
+    def get_collapsed_field(self, name: str) -> serializers.Field:
+        return serializers.PrimaryKeyRelatedField(read_only=True)
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -27,24 +73,73 @@ class MinialProjectSerializer(serializers.ModelSerializer):
         fields = ('id', 'title', 'code', 'created_at', 'url')
 
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     created_by = UserSerializer(read_only=True)
+    task_counts = serializers.SerializerMethodField()
+
+    expandable_fields = ('created_by',)
 
     class Meta:
         model = Project
-        fields = '__all__'
+        exclude = ('next_task_number',)
         read_only_fields = ('created_at', 'modified_at', 'created_by')
 
+    @extend_schema_field({'type': 'object', 'additionalProperties': {'type': 'integer'}})
+    def get_task_counts(self, obj: Project):
+        """Number of the projects tasks in each status"""
+        counts = {s.name: 0 for s in TaskStatus}
+        for counter in obj.task_counters.all():
+            counts[counter.status.name] = counter.count
+        return counts
+
     def update(self, instance: Project, validated_data):
         """
-        update the tasks code if the projects code has been updated
+        update the tasks code if the projects code has been updated,
+        swapping the code prefix of every task in a single UPDATE
         """
-        if instance.code != validated_data['code']:
-            tasks = instance.tasks.filter(project=instance)
-            for t in tasks:
-                t.code = t.code.replace(instance.code, validated_data['code'])
-                t.save()
-        return super().update(instance, validated_data)
+        code = validated_data.get('code', instance.code)
+        with transaction.atomic():
+            if instance.code != code:
+                prefix = f'{instance.code}-'
+                instance.tasks.filter(code__startswith=prefix).update(
+                    code=Concat(Value(f'{code}-'), Substr('code', len(prefix) + 1)),
+                    modified_at=timezone.now()
+                )
+            return super().update(instance, validated_data)
+
+
+class AssigneeWorkloadSerializer(serializers.Serializer):
+    assigned_to = serializers.DictField()
+    total = serializers.IntegerField()
+    open = serializers.IntegerField()
+    overdue = serializers.IntegerField()
+
+
+class ProjectStatsSerializer(serializers.Serializer):
+    total = serializers.IntegerField()
+    overdue = serializers.IntegerField()
+    by_status = serializers.DictField(child=serializers.IntegerField())
+    by_issue = serializers.DictField(child=serializers.IntegerField())
+    workload = AssigneeWorkloadSerializer(many=True)
+
+
+class DurationPercentilesSerializer(serializers.Serializer):
+    count = serializers.IntegerField()
+    p50 = serializers.FloatField(allow_null=True)
+    p85 = serializers.FloatField(allow_null=True)
+    p95 = serializers.FloatField(allow_null=True)
+
+
+class WeeklyThroughputSerializer(serializers.Serializer):
+    week = serializers.DateField()
+    completed = serializers.IntegerField()
+
+
+class ProjectAnalyticsSerializer(serializers.Serializer):
+    since = serializers.DateTimeField()
+    lead_time = DurationPercentilesSerializer()
+    cycle_time = DurationPercentilesSerializer()
+    throughput = WeeklyThroughputSerializer(many=True)
 
 
 class SubTaskSerializer(serializers.ModelSerializer):
@@ -62,11 +157,78 @@ class SubTaskSerializer(serializers.ModelSerializer):
         )
 
 
-class TaskSerializer(serializers.ModelSerializer):
-    project_id = serializers.PrimaryKeyRelatedField(write_only=True, queryset=Project.objects.all())
-    assigned_to_id = serializers.PrimaryKeyRelatedField(write_only=True, queryset=User.objects.all())
-    parent_id = serializers.PrimaryKeyRelatedField(write_only=True, required=False, queryset=Task.objects.all(),
-                                                   allow_null=True)
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolve primary keys from the rows TaskListSerializer loaded in bulk,
+    falling back to a lookup for keys that were not preloaded
+    """
+
+    def to_internal_value(self, data):
+        preloaded = self.context.get('preloaded', {}).get(self.field_name)
+        if preloaded and isinstance(data, (int, str)) and str(data).isdigit():
+            obj = preloaded.get(int(data))
+            if obj is not None:
+                return obj
+        return super().to_internal_value(data)
+
+
+class TaskListSerializer(serializers.ListSerializer):
+    """
+    Validate and create many tasks at once.
+    Related rows are loaded with one query per relation before validation, codes are
+    reserved as a block per project and the tasks are written with bulk_create.
+    """
+    batch_size = 500
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.preload(data)
+        return super().to_internal_value(data)
+
+    def preload(self, data: list):
+        preloaded = {}
+        for name, field in self.child.fields.items():
+            if not isinstance(field, PreloadedPrimaryKeyRelatedField):
+                continue
+            pks = {
+                int(item[name]) for item in data
+                if isinstance(item, dict) and isinstance(item.get(name), (int, str)) and str(item[name]).isdigit()
+            }
+            preloaded[name] = field.get_queryset().in_bulk(pks)
+        self.context['preloaded'] = preloaded
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            counts = Counter(attrs['project_id'] for attrs in validated_data)
+            # Locked in id order, two imports into the same projects cannot wait on each other
+            numbers = {
+                project: get_task_code(project, count)
+                for project, count in sorted(counts.items(), key=lambda item: item[0].pk)
+            }
+            tasks = []
+            for attrs in validated_data:
+                project = attrs['project_id']
+                tasks.append(self.child.build(attrs, numbers[project]))
+                numbers[project] += 1
+            Task.objects.bulk_create(tasks, batch_size=self.batch_size)
+            update_counters(added=[task_state(task) for task in tasks])
+            record_transitions(
+                [(task.pk, task.project_id, None, task.status) for task in tasks], request_user(self.context)
+            )
+
+        # bulk_create sends no signals, the lists showing the tasks are dropped here
+        list_cache.invalidate(*set().union(*map(task_list_users, tasks)))
+        for task in tasks:
+            # New tasks have no subtasks, there is nothing to look up
+            task.prefetched_subtasks = []
+        return tasks
+
+
+class TaskSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    project_id = PreloadedPrimaryKeyRelatedField(write_only=True, queryset=Project.objects.all())
+    assigned_to_id = PreloadedPrimaryKeyRelatedField(write_only=True, queryset=User.objects.all())
+    parent_id = PreloadedPrimaryKeyRelatedField(write_only=True, required=False, queryset=Task.objects.all(),
+                                                allow_null=True)
     project = MinialProjectSerializer(read_only=True)
     assigned_to = UserSerializer(read_only=True)
     created_by = UserSerializer(read_only=True)
@@ -79,17 +241,37 @@ class TaskSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'project_id', 'project', 'title', 'description', 'assigned_to',
             'assigned_to_id', 'created_by', 'status', 'code', 'due_date',
-            'created_at', 'modified_at', 'parent_id', 'subtasks', 'issue', 'parent'
+            'created_at', 'modified_at', 'parent_id', 'subtasks', 'subtask_count',
+            'subtask_done_count', 'issue', 'parent'
         )
         read_only_fields = ('code', 'created_at', 'modified_at')
+        list_serializer_class = TaskListSerializer
+
+    expandable_fields = ('project', 'assigned_to', 'created_by', 'subtasks')
+
+    def get_collapsed_field(self, name: str) -> serializers.Field:
+        if name == 'subtasks':
+            return serializers.SerializerMethodField(method_name='get_subtask_ids')
+        return super().get_collapsed_field(name)
 
     @extend_schema_field(SubTaskSerializer(many=True))
     def get_subtasks(self, obj: Task):
         if obj.issue is Issue.EPIC:
-            sub = Task.objects.filter(parent=obj.id)
+            # Use the subtasks batched by TaskViewSet.get_queryset when available
+            sub = getattr(obj, 'prefetched_subtasks', None)
+            if sub is None:
+                sub = Task.objects.filter(parent=obj.id)
             return SubTaskSerializer(sub, context=self.context, many=True).data
         return []
 
+    def get_subtask_ids(self, obj: Task):
+        if obj.issue is Issue.EPIC:
+            sub = getattr(obj, 'prefetched_subtasks', None)
+            if sub is None:
+                sub = Task.objects.filter(parent=obj.id).order_by('id')
+            return [task.id for task in sub]
+        return []
+
     def validate(self, attrs):
         issue = attrs.get('issue')
         parent = attrs.get('parent_id')
@@ -99,15 +281,21 @@ class TaskSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError('Subtask cannot have subtask parent')
         if issue == Issue.SUBTASK and not parent:
             raise serializers.ValidationError({'issue': 'Subtask needs a parent'})
+        if self.instance is not None:
+            if 'status' not in self.initial_data:
+                # Filled in by the default, the task keeps its status instead
+                attrs.pop('status', None)
+            validate_transition(self.instance, attrs)
         return attrs
 
-    def create(self, validated_data):
+    @staticmethod
+    def build(validated_data, number: int) -> Task:
+        """Build an unsaved task numbered `number` in its project"""
         project = validated_data.pop('project_id')
         assigned_to = validated_data.pop('assigned_to_id')
         parent = validated_data.pop('parent_id', None)
-        count = get_task_code(project)
-        code = f'{project.code}-{count}'
-        return Task.objects.create(
+        code = f'{project.code}-{number}'
+        return Task(
             code=code,
             project=project,
             assigned_to=assigned_to,
@@ -115,6 +303,15 @@ class TaskSerializer(serializers.ModelSerializer):
             **validated_data
         )
 
+    def create(self, validated_data):
+        count = get_task_code(validated_data['project_id'])
+        task = self.build(validated_data, count)
+        with transaction.atomic():
+            task.save(force_insert=True)
+            update_counters(added=[task_state(task)])
+            record_transitions([(task.pk, task.project_id, None, task.status)], request_user(self.context))
+        return task
+
     def update(self, instance: Task, validated_data):
         if Task.objects.filter(parent=instance).exists():
             raise serializers.ValidationError({'issue': ['Subtask cannot have subtasks']})
@@ -130,13 +327,219 @@ class TaskSerializer(serializers.ModelSerializer):
         instance.description = validated_data.get('description', instance.description)
         instance.status = validated_data.get('status', instance.status)
         instance.issue = validated_data.get('issue', instance.status)
-        instance.save()
+        with transaction.atomic():
+            current = lock_task(instance)
+            before = task_state(current)
+            instance.initial_users = current.initial_users
+            instance.save()
+            record_lost_users(instance)
+            update_counters(added=[task_state(instance)], removed=[before])
+            record_transitions(
+                [(instance.pk, instance.project_id, before[2], instance.status)], request_user(self.context)
+            )
         return instance
 
 
+class TaskNodeSerializer(serializers.ModelSerializer):
+    url = serializers.HyperlinkedIdentityField(
+        read_only=True,
+        lookup_field='code',
+        view_name='task-detail'
+    )
+    assigned_to = UserSerializer(read_only=True)
+    created_by = UserSerializer(read_only=True)
+    status = NamedEnumField(TaskStatus, read_only=True)
+    issue = NamedEnumField(Issue, read_only=True)
+
+    class Meta:
+        model = Task
+        fields = (
+            'id', 'code', 'title', 'description', 'status', 'issue', 'due_date',
+            'assigned_to', 'created_by', 'created_at', 'modified_at', 'url'
+        )
+
+
+class SubtaskRollupSerializer(serializers.Serializer):
+    total = serializers.IntegerField()
+    open = serializers.IntegerField()
+    done = serializers.IntegerField()
+    overdue = serializers.IntegerField()
+    by_status = serializers.DictField(child=serializers.IntegerField())
+
+
+class TaskTreeSerializer(TaskNodeSerializer):
+    """A task with its project and its subtasks, rendered from the rows tree_plan loads"""
+    project = MinialProjectSerializer(read_only=True)
+    rollup = serializers.SerializerMethodField()
+    subtasks = TaskNodeSerializer(many=True, read_only=True, source='tree_subtasks')
+
+    class Meta(TaskNodeSerializer.Meta):
+        fields = TaskNodeSerializer.Meta.fields + ('project', 'parent', 'rollup', 'subtasks')
+
+    @extend_schema_field(SubtaskRollupSerializer)
+    def get_rollup(self, obj: Task):
+        """Subtask counts by status, open, completed and overdue ones"""
+        by_status = Counter(task.status for task in obj.tree_subtasks)
+        today = timezone.localdate()
+        return {
+            'total': len(obj.tree_subtasks),
+            'open': sum(n for s, n in by_status.items() if s not in (TaskStatus.COMPLETE, TaskStatus.ARCHIVE)),
+            'done': by_status[TaskStatus.COMPLETE],
+            'overdue': sum(
+                1 for task in obj.tree_subtasks
+                if task.due_date and task.due_date < today
+                and task.status not in (TaskStatus.COMPLETE, TaskStatus.ARCHIVE)
+            ),
+            'by_status': {s.name: by_status[s] for s in TaskStatus},
+        }
+
+
+class BoardCardSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    code = serializers.CharField()
+    title = serializers.CharField()
+    status = NamedEnumField(TaskStatus)
+    issue = NamedEnumField(Issue)
+    parent = serializers.IntegerField(allow_null=True)
+    due_date = serializers.DateField(allow_null=True)
+    modified_at = serializers.DateTimeField()
+    assigned_to = serializers.DictField()
+
+
+class BoardColumnSerializer(serializers.Serializer):
+    status = NamedEnumField(TaskStatus)
+    total = serializers.IntegerField()
+    tasks = BoardCardSerializer(many=True)
+
+
+class TaskBoardSerializer(serializers.Serializer):
+    limit = serializers.IntegerField()
+    columns = BoardColumnSerializer(many=True)
+
+
 class TaskStatusSerializer(serializers.ModelSerializer):
     status = NamedEnumField(TaskStatus, required=True)
 
     class Meta:
         model = Task
         fields = ('status',)
+
+    def validate(self, attrs):
+        validate_transition(self.instance, attrs)
+        return attrs
+
+    def update(self, instance: Task, validated_data):
+        with transaction.atomic():
+            before = task_state(lock_task(instance))
+            instance = super().update(instance, validated_data)
+            update_counters(added=[task_state(instance)], removed=[before])
+            record_transitions(
+                [(instance.pk, instance.project_id, before[2], instance.status)], request_user(self.context)
+            )
+        return instance
+
+
+class BulkStatusResultSerializer(serializers.Serializer):
+    code = serializers.CharField()
+    result = serializers.ChoiceField(choices=('updated', 'unchanged', 'not_found', 'invalid_transition'))
+
+
+class BulkStatusSerializer(serializers.Serializer):
+    """
+    Move the tasks given by their codes, or matched by a task filter, to one status.
+    Codes of tasks that do not exist or are not visible are reported as not found,
+    tasks the workflow does not allow to move to the status are left as they are.
+    """
+    max_tasks = 1000
+
+    status = NamedEnumField(TaskStatus, required=True)
+    codes = serializers.ListField(
+        child=serializers.CharField(), required=False, allow_empty=False, max_length=max_tasks, write_only=True
+    )
+    filter = serializers.DictField(
+        required=False, allow_empty=False, write_only=True, help_text='Task filter parameters'
+    )
+    updated = serializers.IntegerField(read_only=True)
+    results = BulkStatusResultSerializer(many=True, read_only=True)
+
+    def validate_filter(self, value: dict):
+        # Unknown parameters are ignored by the filter, which would then match every task
+        unknown = sorted(set(value) - set(TaskFilter.base_filters))
+        if unknown:
+            raise serializers.ValidationError(f'Unknown filters: {", ".join(unknown)}')
+        return value
+
+    def validate(self, attrs):
+        if ('codes' in attrs) == ('filter' in attrs):
+            raise serializers.ValidationError('Either codes or filter is required')
+        return attrs
+
+    def create(self, validated_data):
+        """Update the tasks of the queryset passed to save() in a single UPDATE"""
+        queryset = validated_data['queryset']
+        status = validated_data['status']
+        codes = validated_data.get('codes')
+        if codes is None:
+            filterset = TaskFilter(validated_data['filter'], queryset=queryset)
+            if not filterset.is_valid():
+                raise serializers.ValidationError({'filter': filterset.errors})
+            queryset = filterset.qs
+        else:
+            queryset = queryset.filter(code__in=codes)
+
+        with transaction.atomic():
+            # Reading the tasks checks they are visible and locks them until they are updated
+            rows = list(queryset.select_for_update(of=('self',)).order_by('id').values_list(
+                'id', 'code', 'status', 'project_id', 'parent_id',
+                'created_by_id', 'assigned_to_id', 'parent__created_by_id', 'parent__assigned_to_id',
+                'project__created_by_id', named=True
+            )[:self.max_tasks + 1])
+            if len(rows) > self.max_tasks:
+                raise serializers.ValidationError({'filter': [f'Matches more than {self.max_tasks} tasks']})
+            changed = [row for row in rows if row.status != status and is_allowed(row.status, status)]
+            if changed:
+                Task.objects.filter(pk__in=[row.id for row in changed]).update(
+                    status=status, modified_at=timezone.now()
+                )
+                update_counters(
+                    added=[(row.project_id, row.parent_id, status) for row in changed],
+                    removed=[(row.project_id, row.parent_id, int(row.status)) for row in changed]
+                )
+                record_transitions(
+                    [(row.id, row.project_id, row.status, status) for row in changed], request_user(self.context)
+                )
+        # The UPDATE sends no signals
+        list_cache.invalidate(*(
+            user for row in changed for user in (
+                row.created_by_id, row.assigned_to_id, row.parent__created_by_id,
+                row.parent__assigned_to_id, row.project__created_by_id
+            )
+        ))
+
+        found = {row.code: row for row in rows}
+        results = []
+        for code in dict.fromkeys(codes or found):
+            if code not in found:
+                result = 'not_found'
+            elif found[code].status == status:
+                result = 'unchanged'
+            elif not is_allowed(found[code].status, status):
+                result = 'invalid_transition'
+            else:
+                result = 'updated'
+            results.append({'code': code, 'result': result})
+        return {'status': status, 'updated': len(changed), 'results': results}
+
+
+class RemovedTaskSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    code = serializers.CharField()
+    reason = serializers.ChoiceField(choices=('archived', 'deleted', 'reassigned'))
+    at = serializers.DateTimeField()
+
+
+class TaskChangesSerializer(serializers.Serializer):
+    changes = TaskSerializer(many=True)
+    removed = RemovedTaskSerializer(many=True)
+    next = serializers.CharField()
+    has_more = serializers.BooleanField()
@@ -0,0 +1,84 @@
+from django.db import connections, router
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_init, post_migrate, post_save
+from django.dispatch import receiver
+
+from umsebenzi.cache import list_cache, task_list_users
+from umsebenzi.counters import task_state, update_counters
+from umsebenzi.models import Project, Task, TaskTombstone
+from umsebenzi.search import connect_fts, install_fts
+
+
+@receiver(post_delete, sender=Task)
+def record_tombstone(sender, instance: Task, **kwargs):
+    TaskTombstone.objects.create(
+        task_id=instance.pk,
+        code=instance.code,
+        created_by_id=instance.created_by_id,
+        assigned_to_id=instance.assigned_to_id
+    )
+
+
+@receiver(post_delete, sender=Task)
+def remove_from_counters(sender, instance: Task, **kwargs):
+    # Subtasks deleted with their epic are sent one by one too, whatever deleted the task
+    update_counters(removed=[task_state(instance)])
+
+
+@receiver(post_init, sender=Task)
+def remember_users(sender, instance: Task, **kwargs):
+    # Reassigned tasks leave the lists of their previous users too
+    instance.initial_users = (instance.__dict__.get('created_by_id'), instance.__dict__.get('assigned_to_id'))
+
+
+def record_lost_users(task: Task):
+    """
+    Tombstone a saved task for the users it was loaded with that no longer see it. Their tombstone is
+    both created by and assigned to them, the task's other users still see it.
+    """
+    users = set(filter(None, task.initial_users)) - {task.created_by_id, task.assigned_to_id}
+    TaskTombstone.objects.bulk_create(
+        TaskTombstone(
+            task_id=task.pk, code=task.code, created_by_id=user, assigned_to_id=user,
+            reason=TaskTombstone.Reason.REASSIGNED
+        )
+        for user in users
+    )
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_task_lists(sender, instance: Task, **kwargs):
+    if list_cache.enabled:
+        list_cache.invalidate(*task_list_users(instance))
+
+
+@receiver(post_save, sender=Project)
+def invalidate_project_lists(sender, instance: Project, created, **kwargs):
+    if list_cache.enabled:
+        users = {instance.created_by_id}
+        if not created:
+            # Task lists render the project of each task
+            for task_users in instance.tasks.order_by().values_list('created_by', 'assigned_to').distinct():
+                users.update(task_users)
+        list_cache.invalidate(*users)
+
+
+@receiver(post_delete, sender=Project)
+def invalidate_deleted_project_lists(sender, instance: Project, **kwargs):
+    list_cache.invalidate(instance.created_by_id)
+
+
+@receiver(post_migrate)
+def repair_search_index(sender, using, **kwargs):
+    # Migrations that rebuild the task table on sqlite drop the search triggers
+    connection = connections[using]
+    if sender.name == 'umsebenzi' and connection.vendor == 'sqlite':
+        install_fts(connection, repair=True)
+
+
+@receiver(connection_created)
+def load_search_table(sender, connection, **kwargs):
+    # Only on the databases tasks are migrated to
+    if connection.vendor == 'sqlite' and router.allow_migrate_model(connection.alias, Task):
+        connect_fts(connection)
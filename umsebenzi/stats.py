@@ -0,0 +1,59 @@
+from django.core.cache import caches
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from umsebenzi.conf import get_setting
+from umsebenzi.enums import Issue, TaskStatus
+from umsebenzi.models import Project
+
+OPEN = ~Q(status__in=[TaskStatus.COMPLETE, TaskStatus.ARCHIVE])
+
+
+def get_project_stats(project: Project) -> dict:
+    """
+    Task counts of a project by status and issue, overdue tasks and the workload
+    of each assignee. Computed with one aggregate and one grouped query.
+    """
+    overdue = OPEN & Q(due_date__lt=timezone.localdate())
+    totals = project.tasks.aggregate(
+        total=Count('id'),
+        overdue=Count('id', filter=overdue),
+        **{f'status_{s.name}': Count('id', filter=Q(status=s)) for s in TaskStatus},
+        **{f'issue_{i.name}': Count('id', filter=Q(issue=i)) for i in Issue},
+    )
+    workload = project.tasks.order_by().values('assigned_to', 'assigned_to__username').annotate(
+        total=Count('id'),
+        open=Count('id', filter=OPEN),
+        overdue=Count('id', filter=overdue),
+    ).order_by('-open', 'assigned_to')
+
+    return {
+        'total': totals['total'],
+        'overdue': totals['overdue'],
+        'by_status': {s.name: totals[f'status_{s.name}'] for s in TaskStatus},
+        'by_issue': {i.name: totals[f'issue_{i.name}'] for i in Issue},
+        'workload': [{
+            'assigned_to': {'id': row['assigned_to'], 'username': row['assigned_to__username']},
+            'total': row['total'],
+            'open': row['open'],
+            'overdue': row['overdue'],
+        } for row in workload]
+    }
+
+
+def get_cached_project_stats(project: Project, ttl: int = None) -> dict:
+    """
+    get_project_stats cached for `ttl` seconds, UMSEBENZI_STATS_CACHE_TTL by default.
+    The statistics are computed on every call when the ttl is 0.
+    """
+    ttl = get_setting('STATS_CACHE_TTL') if ttl is None else ttl
+    if not ttl:
+        return get_project_stats(project)
+
+    cache = caches[get_setting('CACHE_ALIAS')]
+    key = f'umsebenzi:project-stats:{project.pk}'
+    stats = cache.get(key)
+    if stats is None:
+        stats = get_project_stats(project)
+        cache.set(key, stats, ttl)
+    return stats
@@ -0,0 +1,93 @@
+"""
+Incremental sync of a users tasks. Changed tasks are read in (modified_at, id)
+order and deleted tasks in (deleted_at, id) order, each from its own index, and
+the cursor handed back to the client holds the last position of both.
+Users who lose a task when it is reassigned get a tombstone of their own.
+
+modified_at and deleted_at are set when a row is written, before its transaction
+commits, so a row can become visible with a position a sync has already passed.
+The cursor of the last page is held back to UMSEBENZI_SYNC_SETTLE_SECONDS ago and
+the rows of that window are read again by the next sync.
+"""
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_naive, make_aware
+
+from umsebenzi.conf import get_setting
+from umsebenzi.enums import TaskStatus
+from umsebenzi.models import TaskTombstone
+from umsebenzi.pagination import decode_cursor, encode_cursor
+from umsebenzi.plans import task_plan
+
+EPOCH = (datetime(1970, 1, 1, tzinfo=timezone.utc), 0)
+
+
+def parse_since(since: str) -> tuple:
+    """
+    Return the (task, deleted) positions of a sync cursor or ISO timestamp.
+    Raise ValueError if it is neither.
+    """
+    if not since:
+        return EPOCH, EPOCH
+
+    timestamp = parse_datetime(since)
+    if timestamp is not None:
+        if is_naive(timestamp):
+            timestamp = make_aware(timestamp)
+        return (timestamp, 0), (timestamp, 0)
+
+    task_cursor, _, deleted_cursor = since.partition('.')
+    return decode_cursor(task_cursor), decode_cursor(deleted_cursor)
+
+
+def make_since(task_position: tuple, deleted_position: tuple) -> str:
+    return f'{encode_cursor(*task_position)}.{encode_cursor(*deleted_position)}'
+
+
+def _after(queryset: QuerySet, field: str, position: tuple) -> QuerySet:
+    timestamp, pk = position
+    return queryset.filter(
+        Q(**{f'{field}__gte': timestamp}),
+        Q(**{f'{field}__gt': timestamp}) | Q(id__gt=pk)
+    ).order_by(field, 'id')
+
+
+def get_changes(tasks: QuerySet, tombstones: QuerySet, since: str, limit: int) -> dict:
+    """
+    Tasks changed and removed after `since`, at most `limit` of each. Rows
+    of the settle window may be returned again by the following sync.
+    Archived tasks are reported as removed along with deleted ones and
+    the ones reassigned away from the user.
+    """
+    task_position, deleted_position = parse_since(since)
+    # A task reassigned away and back again is visible, its tombstone is outdated
+    tombstones = tombstones.exclude(reason=TaskTombstone.Reason.REASSIGNED, task_id__in=tasks.values('pk'))
+    changed = list(task_plan(_after(tasks, 'modified_at', task_position))[:limit + 1])
+    deleted = list(_after(tombstones, 'deleted_at', deleted_position)[:limit + 1])
+    has_more = len(changed) > limit or len(deleted) > limit
+    changed, deleted = changed[:limit], deleted[:limit]
+
+    if changed:
+        task_position = changed[-1].modified_at, changed[-1].id
+    if deleted:
+        deleted_position = deleted[-1].deleted_at, deleted[-1].id
+    if not has_more:
+        # Held back on the last page only, the pages before it must move forward to end
+        settled = (datetime.now(timezone.utc) - timedelta(seconds=get_setting('SYNC_SETTLE_SECONDS')), 0)
+        task_position, deleted_position = min(task_position, settled), min(deleted_position, settled)
+
+    removed = [
+        {'id': task.id, 'code': task.code, 'reason': 'archived', 'at': task.modified_at}
+        for task in changed if task.status is TaskStatus.ARCHIVE
+    ] + [
+        {'id': tombstone.task_id, 'code': tombstone.code, 'reason': tombstone.reason, 'at': tombstone.deleted_at}
+        for tombstone in deleted
+    ]
+    return {
+        'changes': [task for task in changed if task.status is not TaskStatus.ARCHIVE],
+        'removed': removed,
+        'next': make_since(task_position, deleted_position),
+        'has_more': has_more,
+    }
@@ -0,0 +1,80 @@
+"""
+The optional task status workflow and the history of status changes.
+
+UMSEBENZI_STATUS_TRANSITIONS maps the name of each status to the names of the
+statuses a task may move to from it. Without it every change is allowed.
+Keeping the current status is always allowed.
+"""
+from functools import lru_cache
+from typing import Iterable, Optional
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from umsebenzi.conf import get_setting
+from umsebenzi.enums import TaskStatus
+from umsebenzi.models import TaskStatusTransition
+
+# A workflow that can be used as UMSEBENZI_STATUS_TRANSITIONS
+WORKFLOW = {
+    'DRAFT': ['READY', 'ARCHIVE'],
+    'READY': ['DRAFT', 'TO_DO', 'ARCHIVE'],
+    'TO_DO': ['READY', 'IN_PROGRESS', 'ARCHIVE'],
+    'IN_PROGRESS': ['TO_DO', 'REVIEW'],
+    'REVIEW': ['IN_PROGRESS', 'COMPLETE'],
+    'COMPLETE': ['REVIEW', 'ARCHIVE'],
+    'ARCHIVE': ['DRAFT'],
+}
+
+
+@lru_cache(maxsize=None)
+def get_transitions() -> Optional[dict]:
+    """The statuses each status may move to, None when any change is allowed"""
+    table = get_setting('STATUS_TRANSITIONS')
+    if table is None:
+        return None
+    transitions = {status: frozenset() for status in TaskStatus}
+    try:
+        for source, targets in table.items():
+            transitions[TaskStatus[source]] = frozenset(TaskStatus[target] for target in targets)
+    except KeyError as e:
+        raise ImproperlyConfigured(f'UMSEBENZI_STATUS_TRANSITIONS: unknown status {e}')
+    return transitions
+
+
+@receiver(setting_changed)
+def reload_transitions(setting, **kwargs):
+    if setting == 'UMSEBENZI_STATUS_TRANSITIONS':
+        get_transitions.cache_clear()
+
+
+def is_allowed(current: int, status: int) -> bool:
+    transitions = get_transitions()
+    return transitions is None or current == status or status in transitions[current]
+
+
+def transition_error(current: int, status: int) -> dict:
+    """Details of a rejected change, for the error response"""
+    current, status = TaskStatus(current), TaskStatus(status)
+    allowed = get_transitions()[current]
+    return {
+        'code': 'invalid_transition',
+        'message': f'A {current.name} task cannot move to {status.name}',
+        'from': current.name,
+        'to': status.name,
+        'allowed': [s.name for s in TaskStatus if s in allowed],
+    }
+
+
+def record_transitions(changes: Iterable[tuple], user=None):
+    """
+    Log the (task_id, project_id, from status, to status) changes that changed the status,
+    a task's creation has no from status
+    """
+    TaskStatusTransition.objects.bulk_create(
+        TaskStatusTransition(
+            task_id=task_id, project_id=project_id, from_status=current, to_status=status, changed_by=user
+        )
+        for task_id, project_id, current, status in changes if current != status
+    )
@@ -1,23 +1,59 @@
-from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.db.models import Count, Max, Q
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
 from django_filters import rest_framework as filters
 
-from umsebenzi.models import Project, Task
-from umsebenzi.serializers import ProjectSerializer, TaskSerializer, TaskStatusSerializer
+from umsebenzi.models import Project, Task, TaskTombstone
+from umsebenzi.serializers import (
+    ProjectSerializer, ProjectStatsSerializer, ProjectAnalyticsSerializer, TaskSerializer, TaskStatusSerializer,
+    TaskChangesSerializer, TaskTreeSerializer, TaskBoardSerializer, BulkStatusSerializer
+)
 from umsebenzi.filters import TaskFilter
+from umsebenzi.pagination import KeysetCursorPagination
+from umsebenzi.plans import project_plan, task_plan, tree_plan
+from umsebenzi.mixins import CachedListMixin, ConditionalGetMixin, MetricsMixin, SparseFieldsMixin
 from umsebenzi.enums import TaskStatus, Issue
+from umsebenzi.stats import get_cached_project_stats
+from umsebenzi.analytics import get_project_analytics
+from umsebenzi.board import get_board
+from umsebenzi.sync import get_changes
+from umsebenzi.conf import get_setting
+from umsebenzi.export import ENCODERS, export_rows
+from umsebenzi.renderers import CSVRenderer, NDJSONRenderer
+from umsebenzi.listing import FastTaskListSerializer
 
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(MetricsMixin, ConditionalGetMixin, CachedListMixin, SparseFieldsMixin, viewsets.ModelViewSet):
     serializer_class = ProjectSerializer
     permission_classes = [IsAuthenticated]
     http_method_names = ['get', 'post', 'put', 'delete']
+    pagination_class = KeysetCursorPagination
+
+    # Actions that serialize full projects and need the eager loading plan
+    planned_actions = ('list', 'retrieve', 'update')
+    analytics_weeks = 12
+    max_analytics_weeks = 104
 
     def get_queryset(self):
-        return Project.objects.filter(created_by=self.request.user)
+        queryset = Project.objects.filter(created_by=self.request.user)
+        if self.action in self.planned_actions:
+            queryset = project_plan(queryset, *self.get_sparse_fields())
+        return queryset
+
+    def get_validators(self, queryset):
+        # Task changes show up in the projects task counts
+        row = queryset.aggregate(
+            count=Count('id', distinct=True),
+            modified=Max('modified_at'),
+            task_count=Count('tasks'),
+            task_modified=Max('tasks__modified_at')
+        )
+        return tuple(row.values()), max(filter(None, (row['modified'], row['task_modified'])), default=None)
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -25,29 +61,100 @@ class ProjectViewSet(viewsets.ModelViewSet):
         serializer.save(created_by=request.user)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(detail=True, methods=['GET'], serializer_class=ProjectStatsSerializer)
+    def stats(self, request, pk=None):
+        """
+        Task counts by status and issue, overdue tasks and assignee workload of the project
+        """
+        project = self.get_object()
+        serializer = self.get_serializer(get_cached_project_stats(project))
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
-class TaskViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['GET'], serializer_class=ProjectAnalyticsSerializer)
+    def analytics(self, request, pk=None):
+        """
+        Lead and cycle time percentiles, in seconds, and weekly throughput of the last ?weeks= weeks
+        """
+        try:
+            weeks = min(max(int(request.query_params['weeks']), 1), self.max_analytics_weeks)
+        except (KeyError, ValueError):
+            weeks = self.analytics_weeks
+        project = self.get_object()
+        serializer = self.get_serializer(get_project_analytics(project, weeks))
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class TaskViewSet(MetricsMixin, ConditionalGetMixin, CachedListMixin, SparseFieldsMixin, viewsets.ModelViewSet):
     serializer_class = TaskSerializer
     permission_classes = [IsAuthenticated]
     lookup_field = 'code'
     filter_backends = (filters.DjangoFilterBackend,)
     filterset_class = TaskFilter
+    pagination_class = KeysetCursorPagination
 
-    def get_queryset(self):
+    # Actions that serialize full tasks and need the eager loading plan
+    planned_actions = ('list', 'retrieve', 'update')
+
+    # Most changes returned by one sync request
+    changes_limit = 100
+    max_changes_limit = 1000
+
+    # Rows the export fetches from the database at a time
+    export_chunk_size = 2000
+
+    # Tasks shown in each column of the board
+    board_limit = 20
+    max_board_limit = 100
+
+    def get_visible_queryset(self):
+        """Every task the user created or is assigned to, archived ones included"""
+        user = self.request.user
+        if get_setting('VISIBILITY_STRATEGY') == 'union':
+            # Each half is a lookup on its own foreign key index
+            created = Task.objects.filter(created_by=user).values('pk')
+            assigned = Task.objects.filter(assigned_to=user).values('pk')
+            return Task.objects.filter(pk__in=created.union(assigned))
         return Task.objects.filter(
-            Q(created_by=self.request.user)
-            | Q(assigned_to=self.request.user)
-        ).exclude(status=TaskStatus.ARCHIVE)
-
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset().filter(issue=Issue.EPIC)
-        queryset = self.filter_queryset(queryset)
-        serializer = self.get_serializer(
-            queryset,
-            context={'request': request},
-            many=True
+            Q(created_by=user)
+            | Q(assigned_to=user)
         )
-        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def get_queryset(self):
+        queryset = self.get_visible_queryset().exclude(status=TaskStatus.ARCHIVE)
+        if self.action == 'list' and not self.lists_subtasks():
+            # Subtasks are listed under their epic
+            queryset = queryset.filter(issue=Issue.EPIC)
+        if self.action in self.planned_actions:
+            queryset = task_plan(queryset, *self.get_sparse_fields())
+        elif self.action == 'tree':
+            queryset = tree_plan(queryset)
+        return queryset
+
+    def lists_subtasks(self) -> bool:
+        """Subtasks are only listed on their own when they are filtered for"""
+        params = self.request.query_params
+        return bool(params.get('issue') or params.get('parent'))
+
+    def get_serializer_class(self):
+        # Lists are read from values() rows unless the serializer has been replaced or the fields
+        # narrowed, the browsable api asks for a POST form through a cloned request
+        if (
+            self.action == 'list' and self.request.method == 'GET'
+            and self.serializer_class is TaskSerializer and get_setting('FAST_TASK_LIST')
+            and not getattr(self, 'swagger_fake_view', False) and self.get_sparse_fields() == (None, None)
+        ):
+            return FastTaskListSerializer
+        return super().get_serializer_class()
+
+    def get_validators(self, queryset):
+        # Responses also render the tasks subtasks and project
+        pks = queryset.values('pk')
+        row = Task.objects.filter(Q(pk__in=pks) | Q(parent__in=pks)).aggregate(
+            count=Count('id'),
+            modified=Max('modified_at'),
+            project_modified=Max('project__modified_at')
+        )
+        return tuple(row.values()), max(filter(None, (row['modified'], row['project_modified'])), default=None)
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -55,9 +162,85 @@ class TaskViewSet(viewsets.ModelViewSet):
         serializer.save(created_by=request.user)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=['POST'])
+    def bulk(self, request):
+        """
+        Create a list of tasks in one transaction
+        """
+        serializer = self.get_serializer(data=request.data, many=True, allow_empty=False)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(created_by=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['GET'], serializer_class=TaskChangesSerializer)
+    def changes(self, request):
+        """
+        Tasks created or modified and tasks deleted or archived since the `since` cursor
+        """
+        try:
+            limit = min(max(int(request.query_params['limit']), 1), self.max_changes_limit)
+        except (KeyError, ValueError):
+            limit = self.changes_limit
+        tombstones = TaskTombstone.objects.filter(
+            Q(created_by=request.user)
+            | Q(assigned_to=request.user)
+        )
+        try:
+            changes = get_changes(self.get_visible_queryset(), tombstones, request.query_params.get('since'), limit)
+        except ValueError:
+            raise ValidationError({'since': ['Invalid cursor or timestamp']})
+        serializer = self.get_serializer(changes)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['GET'], renderer_classes=[NDJSONRenderer, JSONRenderer, CSVRenderer])
+    def export(self, request):
+        """
+        Stream every task the user can see, archived ones included, as ndjson, json or csv
+        """
+        renderer = request.accepted_renderer
+        rows = export_rows(self.filter_queryset(self.get_visible_queryset()), self.export_chunk_size)
+        response = StreamingHttpResponse(
+            ENCODERS[renderer.format](rows),
+            content_type=f'{renderer.media_type}; charset=utf-8'
+        )
+        response['Content-Disposition'] = f'attachment; filename="tasks.{renderer.format}"'
+        return response
+
     def partial_update(self, request, code=None):
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
+    @action(detail=False, methods=['PATCH'], url_path='status', url_name='bulk-status',
+            serializer_class=BulkStatusSerializer)
+    def bulk_status(self, request):
+        """
+        Update the status of a list of tasks, given by their codes or a filter
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(queryset=self.get_queryset())
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['GET'], serializer_class=TaskBoardSerializer)
+    def board(self, request):
+        """
+        The tasks in a column per status, the ?limit= most recently changed of each, and the column totals
+        """
+        try:
+            limit = min(max(int(request.query_params['limit']), 1), self.max_board_limit)
+        except (KeyError, ValueError):
+            limit = self.board_limit
+        columns = get_board(self.filter_queryset(self.get_queryset()), limit)
+        serializer = self.get_serializer({'limit': limit, 'columns': columns})
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['GET'], serializer_class=TaskTreeSerializer)
+    def tree(self, request, code=None):
+        """
+        The task with its project, users and subtasks, and counts of its subtasks by status
+        """
+        serializer = self.get_serializer(self.get_object())
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
     @action(detail=True, methods=['PATCH'], serializer_class=TaskStatusSerializer)
     def status(self, request, code=None):
         """